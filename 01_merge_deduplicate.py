@@ -1,22 +1,40 @@
 """
 01_merge_deduplicate.py
 =======================
-Merges the DataInt (JSON) and Aliado (Excel) incident datasets,
-standardises columns, and flags likely cross-source duplicates
-using a 1 km spatial + 2-hour temporal proximity threshold.
+Merges the DataInt (JSON) and Aliado (Excel) incident datasets — and any
+other feed added to the source registry (SOURCES) — standardises columns,
+and flags likely cross-source duplicates
+using a 1 km (great-circle) spatial + 2-hour temporal proximity threshold.
+Repeated reports (within and across sources) are then clustered into
+canonical incidents.
 
 Outputs:
-    data/mexico_incidents_COMBINED_feb22-23_2026.xlsx
+    data/mexico_incidents_COMBINED_feb22-23_2026.parquet    one row per raw record
+    data/mexico_incidents_INCIDENTS_feb22-23_2026.parquet   one row per canonical incident
+    data/mexico_incidents_COMBINED_feb22-23_2026.xlsx       only with --excel
+
+Incremental mode (--incremental) merges only records that are new or
+changed since the last run (tracked in data/merge_watermark.json) into the
+existing store; pair and incident IDs already issued are kept.
 
 Usage:
-    python code/01_merge_deduplicate.py
+    python code/01_merge_deduplicate.py [--excel] [--incremental] [--text-confirm]
+    python code/01_merge_deduplicate.py --sweep     # data/dedup_sensitivity.csv only
 """
 
+import argparse
 import json
+import re
+import unicodedata
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache, partial
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from scipy.spatial.distance import cdist
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 
 # ── Paths ─────────────────────────────────────────────────────────────────────
 ROOT       = Path(__file__).resolve().parent.parent
@@ -24,46 +42,104 @@ RAW_DIR    = ROOT / "data" / "raw"
 OUT_DIR    = ROOT / "data"
 DATAINT_F  = RAW_DIR / "dataint_feb22-23_2026.json"
 ALIADO_F   = RAW_DIR / "aliado_feb22-23_2026.xlsx"
-OUTPUT_F   = OUT_DIR / "mexico_incidents_COMBINED_feb22-23_2026.xlsx"
+RECORDS_F  = OUT_DIR / "mexico_incidents_COMBINED_feb22-23_2026.parquet"
+INCIDENTS_F= OUT_DIR / "mexico_incidents_INCIDENTS_feb22-23_2026.parquet"
+EXCEL_F    = OUT_DIR / "mexico_incidents_COMBINED_feb22-23_2026.xlsx"
+WATERMARK_F= OUT_DIR / "merge_watermark.json"
+SWEEP_F    = OUT_DIR / "dedup_sensitivity.csv"
 
 # t=0: approximate onset of main activation wave
 T0 = pd.Timestamp("2026-02-22 15:00:00", tz="America/Mexico_City")
 
 
 # ── 1. Load DataInt ────────────────────────────────────────────────────────────
+# The DataInt API pages its results (`total`, `links.next`, skip/limit=250).
+# DATAINT_F may be a single export or a directory of page dumps
+# (dataint_page1.json, dataint_page2.json, ...); pages are read one at a time.
+DATAINT_PAGE_GLOB = "*page*.json"
+
+
+def _page_number(path: Path) -> tuple:
+    digits = "".join(ch if ch.isdigit() else " " for ch in path.stem).split()
+    return (int(digits[-1]) if digits else 0, path.name)
+
+
+def iter_dataint_pages(path: Path):
+    """Yield the record list of each DataInt page, one file in memory at a time."""
+    files = sorted(path.glob(DATAINT_PAGE_GLOB), key=_page_number) \
+        if path.is_dir() else [path]
+    for f in files:
+        with open(f, encoding="utf-8") as fh:
+            raw = json.load(fh)
+        if isinstance(raw, list):
+            yield raw
+        else:
+            yield raw.get("data", raw.get("incidents", []))
+
+
+def _pick(raw: pd.DataFrame, *names, default=None) -> pd.Series:
+    """First of `names` present in `raw`, else a constant column."""
+    for name in names:
+        if name in raw.columns:
+            return raw[name]
+    return pd.Series(default, index=raw.index, dtype=object)
+
+
+def _dataint_page_frame(records: list) -> pd.DataFrame:
+    """One page of raw DataInt records → standard columns, parsed column-wise."""
+    raw = pd.DataFrame.from_records(records)
+
+    if "datetime" in raw.columns:   # API: epoch milliseconds
+        ts = pd.to_datetime(pd.to_numeric(raw["datetime"], errors="coerce"),
+                            unit="ms", utc=True)
+    else:                           # legacy exports: ISO strings
+        ts = pd.to_datetime(_pick(raw, "timestamp", "date"), utc=True, errors="coerce")
+
+    if "geometry" in raw.columns:   # GeoJSON Point: [lon, lat]
+        xy  = raw["geometry"].str.get("coordinates")
+        lon = pd.to_numeric(xy.str.get(0), errors="coerce").values.astype(float)
+        lat = pd.to_numeric(xy.str.get(1), errors="coerce").values.astype(float)
+    else:
+        lat = pd.to_numeric(_pick(raw, "latitude",  "lat"), errors="coerce").values
+        lon = pd.to_numeric(_pick(raw, "longitude", "lon"), errors="coerce").values
+
+    return pd.DataFrame({
+        "Source":         "DataInt",
+        "EventID":        _pick(raw, "uuid", "id", "event_id", default="").fillna("").astype(str).values,
+        "Timestamp":      ts.values,
+        "Latitude":       lat,
+        "Longitude":      lon,
+        "State":          _pick(raw, "state", default="").values,
+        "Municipality":   _pick(raw, "municipality", "city", default="").values,
+        "Subtype":        _pick(raw, "subtype", "type", default="").values,
+        "Severity":       pd.to_numeric(_pick(raw, "severity"), errors="coerce")
+                            .fillna(1).astype(int).values,
+        "Description":    _pick(raw, "description_en", "description", "summary",
+                                default="").values,
+        "DescriptionES":  _pick(raw, "description_es", default="").fillna("").values,
+        "StateID":        _pick(raw, "state_id", default="").fillna("").astype(str).values,
+        "MunicipalityID": _pick(raw, "municipality_id", default="").fillna("").astype(str).values,
+    })
+
+
 def load_dataint(path: Path) -> pd.DataFrame:
-    with open(path, encoding="utf-8") as f:
-        raw = json.load(f)
-
-    records = raw if isinstance(raw, list) else raw.get("incidents", raw.get("data", []))
-
-    rows = []
-    for r in records:
-        rows.append({
-            "Source":      "DataInt",
-            "EventID":     str(r.get("id", r.get("event_id", ""))),
-            "Timestamp":   pd.to_datetime(r.get("timestamp", r.get("date", "")), utc=True)
-                             .tz_convert("America/Mexico_City"),
-            "Latitude":    float(r.get("latitude",  r.get("lat", np.nan))),
-            "Longitude":   float(r.get("longitude", r.get("lon", np.nan))),
-            "State":       r.get("state", ""),
-            "Municipality": r.get("municipality", r.get("city", "")),
-            "Subtype":     r.get("subtype", r.get("type", "")),
-            "Severity":    int(r.get("severity", 1)),
-            "Description": r.get("description", r.get("summary", "")),
-        })
-
-    df = pd.DataFrame(rows)
-    print(f"DataInt loaded: {len(df)} records")
+    frames = [_dataint_page_frame(recs) for recs in iter_dataint_pages(path) if recs]
+    if not frames:
+        frames = [_dataint_page_frame([])]
+    df = pd.concat(frames, ignore_index=True)
+    # Overlapping page windows repeat records; keep the first copy
+    df = df[~(df["EventID"].duplicated() & (df["EventID"] != ""))]
+    df["SubtypeNorm"] = normalise_dataint_subtype(df["Subtype"])
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"], utc=True) \
+                        .dt.tz_convert("America/Mexico_City")
+    df = df.reset_index(drop=True)
+    print(f"DataInt loaded: {len(df)} records from {len(frames)} page(s)")
     return df
 
 
-# ── 2. Load Aliado ─────────────────────────────────────────────────────────────
-def load_aliado(path: Path) -> pd.DataFrame:
-    xl = pd.read_excel(path)
-
-    # Normalise column names — Aliado exports vary; adjust as needed
-    col_map = {
+# ── 2. Load tabular feeds (Aliado, ...) ───────────────────────────────────────
+# Normalise column names — Aliado exports vary; adjust as needed
+ALIADO_COLUMNS = {
         # common Aliado export column names → our standard names
         "fecha":         "Timestamp",
         "date":          "Timestamp",
@@ -84,23 +160,35 @@ def load_aliado(path: Path) -> pd.DataFrame:
         "severidad":     "Severity",
         "severity":      "Severity",
         "id":            "EventID",
-    }
+}
+
+
+def load_tabular(path: Path, source: str, col_map: dict, id_prefix: str) -> pd.DataFrame:
+    """
+    Excel/CSV alert export → standard columns. `col_map` maps lower-cased
+    export headers to standard names; severity and SubtypeNorm come from
+    the alert lexicon when the export does not provide them.
+    """
+    xl = pd.read_csv(path) if path.suffix.lower() == ".csv" else pd.read_excel(path)
     xl.columns = [c.lower().strip() for c in xl.columns]
     xl = xl.rename(columns={k: v for k, v in col_map.items() if k in xl.columns})
 
     # Ensure required columns exist
-    for col in ["Timestamp", "Latitude", "Longitude", "Subtype", "Description"]:
+    for col in ["Timestamp", "Latitude", "Longitude", "State", "Municipality",
+                "Subtype", "Description"]:
         if col not in xl.columns:
             xl[col] = np.nan if col in ("Latitude", "Longitude") else ""
 
+    # Severity (when not exported) and normalised subtype from the lexicon
+    cls = classify_alerts(xl["Subtype"], xl["Description"])
+    xl["SubtypeNorm"] = cls["SubtypeNorm"].values
     if "Severity" not in xl.columns:
-        # Infer severity from subtype keywords
-        xl["Severity"] = xl["Subtype"].apply(_infer_severity)
+        xl["Severity"] = cls["Severity"].values
 
     if "EventID" not in xl.columns:
-        xl["EventID"] = [f"ALI_{i:04d}" for i in range(len(xl))]
+        xl["EventID"] = [f"{id_prefix}_{i:04d}" for i in range(len(xl))]
 
-    xl["Source"] = "Aliado"
+    xl["Source"] = source
     xl["Timestamp"] = pd.to_datetime(xl["Timestamp"], utc=False, errors="coerce")
     # Localise if tz-naive
     if xl["Timestamp"].dt.tz is None:
@@ -114,102 +202,854 @@ def load_aliado(path: Path) -> pd.DataFrame:
     xl["Longitude"] = pd.to_numeric(xl["Longitude"], errors="coerce")
 
     df = xl[["Source", "EventID", "Timestamp", "Latitude", "Longitude",
-             "State", "Municipality", "Subtype", "Severity", "Description"]].copy()
-    print(f"Aliado loaded: {len(df)} records")
+             "State", "Municipality", "Subtype", "SubtypeNorm", "Severity",
+             "Description"]].copy()
+    print(f"{source} loaded: {len(df)} records")
     return df
 
 
-def _infer_severity(subtype: str) -> int:
-    """Heuristic severity inference from Aliado alert text."""
-    s = str(subtype).lower()
-    if any(w in s for w in ("enfrentamiento", "ataque armado", "balacera", "artefacto")):
-        return 3
-    if any(w in s for w in ("bloqueo", "incendio", "quema")):
-        return 2
-    return 1
+def load_aliado(path: Path) -> pd.DataFrame:
+    return load_tabular(path, "Aliado", ALIADO_COLUMNS, "ALI")
+
+
+# Aliado alerts carry free-text Spanish titles (with emoji and misspellings
+# such as "narcobloquoes"); severity and a normalised subtype come from the
+# keyword lexicon in alert_lexicon.json, compiled into a single regex.
+LEXICON_F = Path(__file__).resolve().parent / "alert_lexicon.json"
+
+
+def fold_text(s: pd.Series) -> pd.Series:
+    """Lower-case, strip accents and drop non-ASCII (emoji), column-wise."""
+    return (s.fillna("").astype(str).str.normalize("NFKD")
+             .str.encode("ascii", "ignore").str.decode("ascii").str.lower())
+
+
+@lru_cache(maxsize=None)
+def load_lexicon(path: Path = LEXICON_F) -> dict:
+    """Lexicon with its rules compiled into one alternation, a named group per rule."""
+    with open(path, encoding="utf-8") as f:
+        lex = json.load(f)
+    rules = lex["rules"]
+    body  = "|".join(f"(?P<r{k}>{'|'.join(r['patterns'])})" for k, r in enumerate(rules))
+    # Cheap first-character guard so the scan skips positions no rule can start at
+    first = {p.removeprefix(r"\b")[0] for r in rules for p in r["patterns"]}
+    if all(c.isalnum() for c in first):
+        body = f"(?=[{''.join(sorted(first))}])(?:{body})"
+    regex = re.compile(body)
+    if regex.groups != len(rules):
+        raise ValueError(f"{path.name}: patterns must use (?:...) for grouping")
+    lex["regex"]    = regex
+    lex["severity"] = np.array([r["severity"] for r in rules])
+    lex["subtype"]  = np.array([r["subtype"] for r in rules], dtype=object)
+    lex["generic"]  = np.array([bool(r.get("generic", False)) for r in rules])
+    return lex
+
+
+def _match_rules(text: pd.Series, lex: dict):
+    """
+    Per row: first matching rule index (-1 if none) and max severity (0).
+    Each distinct text is folded and scanned once with the compiled regex.
+    """
+    codes, uniq = pd.factorize(text.fillna("").astype(str))
+    finditer = lex["regex"].finditer
+    sev      = lex["severity"].tolist()
+    rule, best = [], []
+    for t in fold_text(pd.Series(uniq, dtype=object)):
+        hits = {m.lastindex - 1 for m in finditer(t)}   # group k+1 = rule k
+        rule.append(min(hits) if hits else -1)
+        best.append(max(sev[h] for h in hits) if hits else 0)
+    return np.array(rule, dtype=np.int64)[codes], np.array(best, dtype=np.int64)[codes]
+
+
+def classify_alerts(titles: pd.Series, descriptions: pd.Series = None,
+                    lexicon: dict = None) -> pd.DataFrame:
+    """
+    Severity and normalised SubtypeNorm from alert titles. Rows whose title
+    matches nothing (or only a generic rule) take SubtypeNorm from their
+    description; Severity stays title-based.
+    """
+    lex = lexicon or load_lexicon()
+    rule, sev = _match_rules(titles, lex)
+
+    if descriptions is not None:
+        weak = (rule < 0) | lex["generic"][rule]
+        if weak.any():
+            d_rule, _ = _match_rules(descriptions[weak], lex)
+            rule[np.flatnonzero(weak)[d_rule >= 0]] = d_rule[d_rule >= 0]
+
+    subtype = np.where(rule >= 0, lex["subtype"][rule], lex["default"]["subtype"])
+    return pd.DataFrame({
+        "Severity":    np.where(sev > 0, sev, lex["default"]["severity"]),
+        "SubtypeNorm": subtype,
+    }, index=titles.index)
+
+
+def normalise_dataint_subtype(subtype: pd.Series) -> pd.Series:
+    """DataInt API codes (narco_blockade) and CSV labels → lexicon subtype names."""
+    codes = subtype.fillna("").astype(str)
+    names = codes.map(load_lexicon()["dataint_subtypes"])
+    return names.fillna(codes.str.replace("_", " ").str.strip())
+
+
+# ── 3. Source registry ─────────────────────────────────────────────────────────
+# Every feed registers a loader that returns the standard columns with its
+# own Source label. Tabular exports only need a column map, e.g.
+#   register_source("C5", RAW_DIR / "c5_alerts.csv", col_map={...}, optional=True)
+# Registration order fixes pair orientation (first-registered source first).
+SOURCES = {}
+
+
+def register_source(name: str, path: Path, loader=None, col_map: dict = None,
+                    id_prefix: str = None, optional: bool = False):
+    if loader is None:
+        loader = partial(load_tabular, source=name, col_map=col_map or {},
+                         id_prefix=id_prefix or name[:3].upper())
+    SOURCES[name] = {"path": Path(path), "loader": loader, "optional": optional}
 
 
-# ── 3. Compute onset hours ─────────────────────────────────────────────────────
+register_source("DataInt", DATAINT_F, loader=load_dataint)
+register_source("Aliado",  ALIADO_F,  loader=load_aliado)
+
+
+def load_sources(sources: dict = None) -> pd.DataFrame:
+    frames = []
+    for name, src in (sources or SOURCES).items():
+        if src["optional"] and not src["path"].exists():
+            print(f"{name}: {src['path']} not found, skipped")
+            continue
+        frames.append(src["loader"](src["path"]))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _source_rank(df: pd.DataFrame) -> np.ndarray:
+    order = {name: k for k, name in enumerate(SOURCES)}
+    return df["Source"].astype(str).map(order).fillna(len(order)).values
+
+
+# ── 4. Compute onset hours ─────────────────────────────────────────────────────
 def add_onset_hours(df: pd.DataFrame) -> pd.DataFrame:
     t0 = T0
     df["OnsetHours"] = (df["Timestamp"] - t0).dt.total_seconds() / 3600
     return df
 
 
-# ── 4. Cross-source deduplication ─────────────────────────────────────────────
-KM_THRESHOLD   = 1.0    # km
-HOUR_THRESHOLD = 2.0    # hours
-DEG_PER_KM     = 1 / 111.0  # approximate
+# ── 5. Cross-source deduplication ─────────────────────────────────────────────
+KM_THRESHOLD    = 1.0       # km
+HOUR_THRESHOLD  = 2.0       # hours
+EARTH_RADIUS_KM = 6371.0088  # mean Earth radius
+
+
+def _unit_xyz(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Lat/lon in degrees → points on the unit sphere (n, 3)."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon),
+                            np.cos(lat) * np.sin(lon),
+                            np.sin(lat)])
+
+
+def _chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Unit-sphere chord length → great-circle distance in km."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+def candidate_pairs(lat_a, lon_a, t_a, lat_b, lon_b, t_b,
+                    km: float = KM_THRESHOLD, hours: float = HOUR_THRESHOLD):
+    """
+    All (i, j) with great-circle distance <= km and |t_a[i] - t_b[j]| <= hours.
+
+    Time-sorted sweep: A is cut into windows `hours` wide; for each window a
+    KD-tree is built over the B records that can still match it
+    ([start - hours, end + hours]) and queried with the chord length that
+    corresponds to `km` on the sphere. Cost scales with the number of real
+    candidates instead of len(A) × len(B). Rows with missing coordinates or
+    times never match.
+
+    Returns (i, j, dist_km, dt_hours) as arrays, sorted by (i, j).
+    """
+    xyz_a, xyz_b = _unit_xyz(lat_a, lon_a), _unit_xyz(lat_b, lon_b)
+    t_a = np.asarray(t_a, dtype=float)
+    t_b = np.asarray(t_b, dtype=float)
+
+    ok_a = np.flatnonzero(np.isfinite(xyz_a).all(axis=1) & np.isfinite(t_a))
+    ok_b = np.flatnonzero(np.isfinite(xyz_b).all(axis=1) & np.isfinite(t_b))
+    ok_a = ok_a[np.argsort(t_a[ok_a], kind="stable")]
+    ok_b = ok_b[np.argsort(t_b[ok_b], kind="stable")]
+    tb_sorted = t_b[ok_b]
+
+    radius = _km_to_chord(km)
+    width  = max(hours, 1e-9)
+    out_i, out_j = [], []
+
+    if len(ok_a) and len(ok_b):
+        win = np.floor((t_a[ok_a] - t_a[ok_a[0]]) / width).astype(np.int64)
+        cuts = np.flatnonzero(np.diff(win)) + 1
+        for block in np.split(ok_a, cuts):
+            lo = np.searchsorted(tb_sorted, t_a[block[0]]  - hours, side="left")
+            hi = np.searchsorted(tb_sorted, t_a[block[-1]] + hours, side="right")
+            if hi <= lo:
+                continue
+            cand_b = ok_b[lo:hi]
+            tree   = cKDTree(xyz_b[cand_b])
+            hits   = tree.query_ball_point(xyz_a[block], r=radius)
+            lens   = np.fromiter(map(len, hits), dtype=np.int64, count=len(hits))
+            if not lens.sum():
+                continue
+            ii = np.repeat(block, lens)
+            jj = cand_b[np.concatenate([h for h in hits if h]).astype(np.int64)]
+            keep = np.abs(t_a[ii] - t_b[jj]) <= hours
+            out_i.append(ii[keep])
+            out_j.append(jj[keep])
+
+    if out_i:
+        i = np.concatenate(out_i)
+        j = np.concatenate(out_j)
+    else:
+        i = j = np.empty(0, dtype=np.int64)
+
+    order = np.lexsort((j, i))
+    i, j  = i[order], j[order]
+    chord = np.linalg.norm(xyz_a[i] - xyz_b[j], axis=1)
+    dist  = _chord_to_km(chord)
+    keep  = dist <= km  # guard the chord/arc round trip at the boundary
+    i, j, dist = i[keep], j[keep], dist[keep]
+    return i, j, dist, np.abs(t_a[i] - t_b[j])
+
+
+# Text confirmation: MinHash signatures over accent-folded word stems, so a
+# candidate pair is scored in O(TEXT_NUM_PERM) without comparing strings.
+# DataInt is matched on its Spanish description, Aliado on title + text.
+TEXT_CONFIRM      = False   # --text-confirm: drop pairs below TEXT_MIN_JACCARD
+TEXT_MIN_JACCARD  = 0.05    # cross-source; Aliado alerts are much shorter
+TEXT_NUM_PERM     = 128
+TEXT_BANDS        = 32      # LSH: 32 bands × 4 rows ≈ 0.42 Jaccard for
+                            # same-source repeats (re-published text)
+TEXT_STEM         = 6       # crude stemmer: incendio/incendiado → incend
+TEXT_BLOCK_TOKENS = 8192    # tokens hashed at once (× TEXT_NUM_PERM uint64)
+_MERSENNE         = np.uint64(4294967311)  # prime > 2**32
+_STOPWORDS = frozenset("""
+    que con las los del por para una uno unos unas este esta como sus mas sin
+    entre sobre tras hasta desde donde cuando fue han sido the and for from
+    with that this have has been were was are its their into over after
+""".split())
+
+
+def match_text(df: pd.DataFrame) -> pd.Series:
+    """Spanish text used for similarity: DescriptionES, else Subtype + Description."""
+    es = df["DescriptionES"].fillna("").astype(str) if "DescriptionES" in df.columns \
+        else pd.Series("", index=df.index)
+    other = df["Subtype"].fillna("").astype(str) + " " + df["Description"].fillna("").astype(str)
+    return es.where(es.str.strip() != "", other)
+
+
+def _shingles(text: str) -> set:
+    s = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return {w[:TEXT_STEM] for w in re.findall(r"[a-z0-9]+", s)
+            if len(w) > 2 and w not in _STOPWORDS}
+
+
+def minhash_signatures(texts, num_perm: int = TEXT_NUM_PERM) -> np.ndarray:
+    """
+    (n, num_perm) uint64 MinHash signatures, hashing (a·x + b) mod p over
+    crc32 token hashes. Texts with no tokens get an all-max signature.
+    Tokens are hashed in blocks of about TEXT_BLOCK_TOKENS whole records.
+    """
+    token_sets = [_shingles(str(t)) for t in texts]
+    lens = np.fromiter(map(len, token_sets), dtype=np.int64, count=len(token_sets))
+    x    = np.fromiter((zlib.crc32(w.encode()) for ts in token_sets for w in ts),
+                       dtype=np.uint64, count=int(lens.sum()))
+
+    rng = np.random.default_rng(1)
+    # x, a < 2**32 and b < p, so a·x + b ≤ (2**32 − 1)**2 + p < 2**64: no wrap
+    a = rng.integers(1, 2**32, num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MERSENNE), num_perm, dtype=np.uint64)
+
+    sig   = np.full((len(token_sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    start = np.cumsum(lens) - lens
+    rows  = np.flatnonzero(lens)
+    block = (start[rows] + lens[rows] - 1) // TEXT_BLOCK_TOKENS
+    for r in np.split(rows, np.flatnonzero(np.diff(block)) + 1) if len(rows) else []:
+        lo, hi = start[r[0]], start[r[-1]] + lens[r[-1]]
+        hv     = (x[lo:hi, None] * a + b) % _MERSENNE
+        sig[r] = np.minimum.reduceat(hv, start[r] - lo, axis=0)
+    return sig
+
+
+def lsh_band_keys(sig: np.ndarray, bands: int = TEXT_BANDS) -> np.ndarray:
+    """One uint64 bucket key per (record, band); equal keys = LSH collision."""
+    n, k = sig.shape
+    rows = k // bands
+    mult = np.random.default_rng(2).integers(1, 2**63, rows, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        return (sig[:, :bands * rows].reshape(n, bands, rows) * mult).sum(axis=2)
+
+
+def text_scores(df: pd.DataFrame, i: np.ndarray, j: np.ndarray):
+    """
+    Estimated Jaccard and LSH collision for pairs (i[k], j[k]) of positional
+    rows. Signatures are computed only for the rows that appear in a pair.
+    """
+    rows, inv = np.unique(np.concatenate([i, j]), return_inverse=True)
+    if not len(rows):
+        return np.empty(0), np.empty(0, dtype=bool)
+    sig  = minhash_signatures(match_text(df.iloc[rows]).values)
+    keys = lsh_band_keys(sig)
+    empty = (sig == np.iinfo(np.uint64).max).all(axis=1)
+    ii, jj = inv[:len(i)], inv[len(i):]
+    ok   = ~(empty[ii] | empty[jj])
+    jac  = np.where(ok, (sig[ii] == sig[jj]).mean(axis=1), 0.0)
+    hit  = ok & (keys[ii] == keys[jj]).any(axis=1)
+    return jac, hit
+
+
+def duplicate_pairs(df: pd.DataFrame, rows_a: np.ndarray, rows_b: np.ndarray):
+    """
+    Cross-source pairs between rows_a and rows_b (positional index labels)
+    within KM_THRESHOLD / HOUR_THRESHOLD, with their text similarity. Every
+    source pair is handled by the same indexed join. Pairs are oriented by
+    SOURCES order, de-duplicated and sorted by (first row, second row) —
+    with two feeds, (DataInt row, Aliado row). With TEXT_CONFIRM, pairs
+    whose descriptions overlap less than TEXT_MIN_JACCARD are dropped.
+    """
+    i, j, _, _ = candidate_pairs(
+        df.loc[rows_a, "Latitude"].values, df.loc[rows_a, "Longitude"].values,
+        df.loc[rows_a, "OnsetHours"].values,
+        df.loc[rows_b, "Latitude"].values, df.loc[rows_b, "Longitude"].values,
+        df.loc[rows_b, "OnsetHours"].values,
+    )
+    p, q  = rows_a[i], rows_b[j]
+    src   = df["Source"].astype(str).values
+    cross = src[p] != src[q]
+    p, q  = p[cross], q[cross]
+
+    rank  = _source_rank(df)
+    swap  = (rank[p] > rank[q]) | ((rank[p] == rank[q]) & (p > q))
+    pq    = np.unique(np.column_stack([np.where(swap, q, p), np.where(swap, p, q)])
+                        .reshape(-1, 2), axis=0)
+    d, a  = pq[:, 0], pq[:, 1]
+
+    sim, _ = text_scores(df, d, a)
+    if TEXT_CONFIRM:
+        keep = sim >= TEXT_MIN_JACCARD
+        d, a, sim = d[keep], a[keep], sim[keep]
+    return d, a, sim
+
+
+def assign_pair_ids(df: pd.DataFrame, d: np.ndarray, a: np.ndarray,
+                    sim: np.ndarray, first: int = 1,
+                    keep_existing: bool = False) -> list:
+    """
+    Number pairs (d[k], a[k]) PAIR_<first + k> and flag both records.
+    A record matched more than once keeps the ID (and text similarity) of
+    its last pair; with `keep_existing`, records that already carry a pair
+    ID keep it.
+    """
+    pids = [f"PAIR_{k:03d}" for k in range(first, first + len(d))]
+    for rows in (d, a):
+        last = pd.DataFrame({"pid": pids, "sim": sim}, index=rows)
+        last = last[~last.index.duplicated(keep="last")]
+        df.loc[last.index, "DuplicateFlag"] = 1
+        if keep_existing:
+            last = last[df.loc[last.index, "DuplicatePairID"].values == ""]
+        df.loc[last.index, "DuplicatePairID"]  = last["pid"]
+        df.loc[last.index, "DuplicateTextSim"] = last["sim"]
+    return pids
 
 
 def flag_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     """
     Flag likely cross-source duplicate pairs using a 1km / 2h threshold.
-    Only compares DataInt rows against Aliado rows (not within-source).
-    Both records in each pair are retained; DuplicateFlag=1 marks them.
-    """
-    di = df[df["Source"] == "DataInt"].copy().reset_index()
-    al = df[df["Source"] == "Aliado"].copy().reset_index()
-
-    di_coords = di[["Latitude", "Longitude"]].values
-    al_coords = al[["Latitude", "Longitude"]].values
-
-    # Pairwise geographic distance (degrees → km approx)
-    geo_dist = cdist(di_coords, al_coords) / DEG_PER_KM  # km
-
-    di_hours = di["OnsetHours"].values
-    al_hours = al["OnsetHours"].values
-    time_dist = np.abs(di_hours[:, None] - al_hours[None, :])  # hours
-
-    pairs = []
-    pair_counter = 0
-    for i in range(len(di)):
-        for j in range(len(al)):
-            if geo_dist[i, j] <= KM_THRESHOLD and time_dist[i, j] <= HOUR_THRESHOLD:
-                pair_counter += 1
-                pid = f"PAIR_{pair_counter:03d}"
-                pairs.append((di.at[i, "index"], al.at[j, "index"], pid))
-
-    df["DuplicateFlag"]   = 0
-    df["DuplicatePairID"] = ""
-
-    for orig_i, orig_j, pid in pairs:
-        df.at[orig_i, "DuplicateFlag"]   = 1
-        df.at[orig_j, "DuplicateFlag"]   = 1
-        df.at[orig_i, "DuplicatePairID"] = pid
-        df.at[orig_j, "DuplicatePairID"] = pid
-
-    n_pairs = len(pairs)
-    print(f"Duplicate pairs flagged: {n_pairs} ({n_pairs * 2} records, "
-          f"{100 * n_pairs * 2 / len(df):.1f}% of combined dataset)")
+    Compares records of every pair of sources (not within-source) in one
+    self-join. Both records in each pair are retained; DuplicateFlag=1
+    marks them.
+
+    Distances are great-circle km; candidates come from `candidate_pairs`,
+    so no source × source matrix is materialised. Pair IDs are numbered in
+    (first-source row, second-source row) order.
+    """
+    rows = np.arange(len(df))
+
+    df["DuplicateFlag"]    = 0
+    df["DuplicatePairID"]  = ""
+    df["DuplicateTextSim"] = np.nan
+    n_pairs = len(assign_pair_ids(df, *duplicate_pairs(df, rows, rows)))
+
+    n_rec   = int(df["DuplicateFlag"].sum())
+    print(f"Duplicate pairs flagged: {n_pairs} ({n_rec} records, "
+          f"{100 * n_rec / len(df):.1f}% of combined dataset)")
+    return df
+
+
+# Sensitivity sweep (--sweep): duplicate share over a (km, hours) grid.
+SWEEP_KM    = [0.25, 0.5, 1.0, 2.0, 5.0, 10.0]
+SWEEP_HOURS = [0.5, 1.0, 2.0, 4.0, 6.0]
+
+
+def sweep_thresholds(df: pd.DataFrame, km_grid=SWEEP_KM,
+                     hour_grid=SWEEP_HOURS) -> pd.DataFrame:
+    """
+    Pair counts and flagged-record shares for every (km, hours) cell in one
+    pass: candidates are collected once at the largest radius and window,
+    each pair is binned to the smallest cell that admits it, and cumulative
+    sums over both axes give the counts. A record is flagged in a cell if
+    any of its pairs fits; its per-km minimum hour bin, carried forward
+    over km, gives that in O(records × len(km_grid)).
+    """
+    km_grid, hour_grid = np.sort(km_grid), np.sort(hour_grid)
+    nk, nh = len(km_grid), len(hour_grid)
+    lat, lon, t = (df[c].values for c in ("Latitude", "Longitude", "OnsetHours"))
+    i, j, dist, dt = candidate_pairs(lat, lon, t, lat, lon, t,
+                                     km=km_grid[-1], hours=hour_grid[-1])
+    src  = df["Source"].astype(str).values
+    keep = (i < j) & (src[i] != src[j])
+    i, j, dist, dt = i[keep], j[keep], dist[keep], dt[keep]
+    if TEXT_CONFIRM:
+        sim, _ = text_scores(df, i, j)
+        keep = sim >= TEXT_MIN_JACCARD
+        i, j, dist, dt = i[keep], j[keep], dist[keep], dt[keep]
+
+    kb = np.searchsorted(km_grid,   dist, side="left")
+    hb = np.searchsorted(hour_grid, dt,   side="left")
+    pairs = np.bincount(kb * nh + hb, minlength=nk * nh).reshape(nk, nh)
+    pairs = pairs.cumsum(axis=0).cumsum(axis=1)
+
+    flagged = np.zeros((nk, nh), dtype=np.int64)
+    rec, r = np.unique(np.concatenate([i, j]), return_inverse=True)
+    best = np.full((len(rec), nk), nh, dtype=np.int64)
+    np.minimum.at(best, (r, np.tile(kb, 2)), np.tile(hb, 2))
+    best = np.minimum.accumulate(best, axis=1)
+    for b in range(nk):
+        flagged[b] = np.bincount(best[:, b], minlength=nh + 1)[:nh].cumsum()
+
+    km_col, h_col = np.meshgrid(km_grid, hour_grid, indexing="ij")
+    return pd.DataFrame({
+        "km":              km_col.ravel(),
+        "hours":           h_col.ravel(),
+        "pairs":           pairs.ravel(),
+        "flagged_records": flagged.ravel(),
+        "flagged_pct":     100 * flagged.ravel() / max(len(df), 1),
+    })
+
+
+# ── 6. Canonical incidents ────────────────────────────────────────────────────
+# Same-source repeats (e.g. DataInt re-publishing an event with nudged
+# coordinates) are held to a tighter window than cross-source matches,
+# so distinct blockades a few blocks apart in one feed stay separate.
+REPEAT_KM_THRESHOLD   = 0.5   # km
+REPEAT_HOUR_THRESHOLD = 0.5   # hours
+
+
+def incident_links(df: pd.DataFrame, rows_a: np.ndarray, rows_b: np.ndarray):
+    """
+    Report links between rows_a and rows_b (positional index labels).
+
+    One `candidate_pairs` join at the wider of the two thresholds; same-source
+    pairs are then kept only within REPEAT_KM/HOUR_THRESHOLD and cross-source
+    pairs within KM/HOUR_THRESHOLD. With TEXT_CONFIRM, same-source links
+    must also collide in the LSH index (near-identical text) and
+    cross-source links reach TEXT_MIN_JACCARD. Returns (a, b, same_source),
+    a != b.
+    """
+    a_, b_ = df.loc[rows_a], df.loc[rows_b]
+    i, j, dist, dt = candidate_pairs(
+        a_["Latitude"].values, a_["Longitude"].values, a_["OnsetHours"].values,
+        b_["Latitude"].values, b_["Longitude"].values, b_["OnsetHours"].values,
+        km=max(KM_THRESHOLD, REPEAT_KM_THRESHOLD),
+        hours=max(HOUR_THRESHOLD, REPEAT_HOUR_THRESHOLD),
+    )
+    a, b = rows_a[i], rows_b[j]
+    src  = df["Source"].astype(str).values
+    same = src[a] == src[b]
+    keep = (a != b) & np.where(
+        same,
+        (dist <= REPEAT_KM_THRESHOLD) & (dt <= REPEAT_HOUR_THRESHOLD),
+        (dist <= KM_THRESHOLD)        & (dt <= HOUR_THRESHOLD))
+    a, b, same = a[keep], b[keep], same[keep]
+    if TEXT_CONFIRM:
+        jac, hit = text_scores(df, a, b)
+        keep = np.where(same, hit, jac >= TEXT_MIN_JACCARD)
+        a, b, same = a[keep], b[keep], same[keep]
+    return a, b, same
+
+
+def cluster_incidents(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Group repeated reports into canonical incidents.
+
+    Links come from one self-join (`incident_links`). Connected components
+    of the resulting sparse pair graph are the incidents, so chains of
+    reports (A~B, B~C) collapse into one. IncidentIDs are numbered by first
+    record in row order; records without coordinates or time stay singletons.
+    """
+    n    = len(df)
+    rows = np.arange(n)
+    i, j, same = incident_links(df, rows, rows)
+    upper = i < j
+    i, j, same = i[upper], j[upper], same[upper]
+
+    graph = coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    codes, _  = pd.factorize(labels)
+
+    df["IncidentID"]   = [f"INC_{k:04d}" for k in codes + 1]
+    df["IncidentSize"] = np.bincount(codes)[codes]
+
+    n_inc = codes.max() + 1 if n else 0
+    print(f"Canonical incidents: {n_inc} from {n} records "
+          f"({int(same.sum())} same-source, {int((~same).sum())} cross-source links)")
+    return df
+
+
+def build_incident_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per IncidentID, in the same column layout as the raw records.
+
+    Descriptive fields come from the representative record (highest
+    Severity, then earliest); Timestamp/OnsetHours are the earliest report,
+    coordinates the mean of all reports, and Source/EventID list every
+    contributing record (";"-joined).
+    """
+    order = df.sort_values(["IncidentID", "Severity", "Timestamp"],
+                           ascending=[True, False, True], kind="stable")
+    g   = order.groupby("IncidentID", sort=True)
+    rep = g.first()
+
+    inc = pd.DataFrame({
+        "IncidentID":   rep.index,
+        "Source":       g["Source"].agg(lambda s: ";".join(sorted(set(s)))).values,
+        "EventID":      g["EventID"].agg(lambda s: ";".join(s.astype(str))).values,
+        "Timestamp":    g["Timestamp"].min().values,
+        "Latitude":     g["Latitude"].mean().values,
+        "Longitude":    g["Longitude"].mean().values,
+        "State":        rep["State"].values,
+        "Municipality": rep["Municipality"].values,
+        "Subtype":      rep["Subtype"].values,
+        "SubtypeNorm":  rep["SubtypeNorm"].values,
+        "Severity":     rep["Severity"].values,
+        "Description":  rep["Description"].values,
+        "OnsetHours":   g["OnsetHours"].min().values,
+        "NReports":     g.size().values,
+    })
+    inc["Timestamp"] = pd.to_datetime(inc["Timestamp"], utc=True) \
+                         .dt.tz_convert("America/Mexico_City")
+    return inc.sort_values("Timestamp", kind="stable").reset_index(drop=True)
+
+
+# ── 7. Columnar store ─────────────────────────────────────────────────────────
+# Fixed schemas for the Parquet artifacts read by 02–04. Categorical
+# State/Subtype/Source keep the files small; Timestamp stays tz-aware.
+TIMESTAMP_DTYPE = pd.DatetimeTZDtype("ns", "America/Mexico_City")
+
+RECORD_SCHEMA = {
+    "Source":          "category",
+    "EventID":         "string",
+    "Timestamp":       TIMESTAMP_DTYPE,
+    "Latitude":        "float64",
+    "Longitude":       "float64",
+    "State":           "category",
+    "Municipality":    "string",
+    "Subtype":         "category",
+    "SubtypeNorm":     "category",
+    "Severity":        "int64",
+    "Description":     "string",
+    "DescriptionES":   "string",
+    "StateID":         "string",
+    "MunicipalityID":  "string",
+    "OnsetHours":      "float64",
+    "DuplicateFlag":   "int8",
+    "DuplicatePairID": "string",
+    "DuplicateTextSim":"float64",
+    "IncidentID":      "string",
+    "IncidentSize":    "int32",
+    "RowHash":         "uint64",
+}
+
+INCIDENT_SCHEMA = {
+    "IncidentID":   "string",
+    "Source":       "category",
+    "EventID":      "string",
+    "Timestamp":    TIMESTAMP_DTYPE,
+    "Latitude":     "float64",
+    "Longitude":    "float64",
+    "State":        "category",
+    "Municipality": "string",
+    "Subtype":      "category",
+    "SubtypeNorm":  "category",
+    "Severity":     "int64",
+    "Description":  "string",
+    "OnsetHours":   "float64",
+    "NReports":     "int32",
+}
+
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Select and cast `df` to `schema`; missing string columns are filled empty."""
+    out = df.reindex(columns=list(schema))
+    for col, dtype in schema.items():
+        if dtype in ("string", "category"):
+            out[col] = out[col].fillna("").astype(str).astype(dtype)
+    return out.astype(schema)
+
+
+def write_store(df: pd.DataFrame, schema: dict, path: Path) -> pd.DataFrame:
+    df = apply_schema(df, schema)
+    df.to_parquet(path, index=False)
+    print(f"Saved: {path}")
     return df
 
 
-# ── 5. Main ────────────────────────────────────────────────────────────────────
+def export_excel(combined: pd.DataFrame, incidents: pd.DataFrame, path: Path):
+    """Legacy workbook; Excel cannot hold tz-aware times, so they are written as local time."""
+    def _naive(df):
+        df = df.copy()
+        df["Timestamp"] = df["Timestamp"].dt.tz_localize(None)
+        return df
+
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        _naive(combined).to_excel(writer, sheet_name="Combined Incidents", index=False)
+        _naive(incidents).to_excel(writer, sheet_name="Incidents", index=False)
+        # Summary sheet
+        summary = combined.groupby(["Source", "Severity"], observed=True) \
+                          .size().unstack(fill_value=0)
+        summary.to_excel(writer, sheet_name="Summary by Severity")
+    print(f"Saved: {path}")
+
+
+# ── 8. Incremental merge ──────────────────────────────────────────────────────
+# A record is identified by (Source, EventID) and versioned by a hash of its
+# source fields; anything whose key+hash is already in the store is skipped.
+HASH_COLUMNS = ["Source", "EventID", "Timestamp", "Latitude", "Longitude",
+                "State", "Municipality", "Subtype", "Severity", "Description"]
+
+
+def record_hash(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df[HASH_COLUMNS], index=False).values
+
+
+def _record_key(df: pd.DataFrame) -> pd.Series:
+    return df["Source"].astype(str) + "|" + df["EventID"].astype(str)
+
+
+def _next_id(ids: pd.Series, prefix: str) -> int:
+    """1 + the largest numbered ID of the form <prefix><n> in `ids`."""
+    s = ids.astype(str)
+    n = pd.to_numeric(s[s.str.startswith(prefix)].str[len(prefix):], errors="coerce")
+    return int(n.max()) + 1 if n.notna().any() else 1
+
+
+def read_watermark(path: Path):
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_watermark(path: Path, combined: pd.DataFrame, mode: str,
+                    n_delta: int) -> dict:
+    wm = {
+        "merged_at":     datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "mode":          mode,
+        "n_records":     int(len(combined)),
+        "n_delta":       int(n_delta),
+        "max_timestamp": str(combined["Timestamp"].max()),
+        "sources":       combined["Source"].astype(str).value_counts().to_dict(),
+        "next_pair":     _next_id(combined["DuplicatePairID"], "PAIR_"),
+        "next_incident": _next_id(combined["IncidentID"], "INC_"),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(wm, f, indent=2)
+    return wm
+
+
+def pair_partners(hist: pd.DataFrame, replaced: np.ndarray) -> np.ndarray:
+    """
+    Mask of stored records (not themselves replaced) that were paired with
+    a `replaced` record, widened to whole DuplicatePairID groups so that no
+    pair ID left in the store loses a holder.
+    """
+    out = np.zeros(len(hist), dtype=bool)
+    if not replaced.any():
+        return out
+    h    = hist.reset_index(drop=True)
+    rows = np.arange(len(h))
+    d, a, _ = duplicate_pairs(h, rows[replaced], rows)
+    out[np.concatenate([d, a])] = True
+    pid  = h["DuplicatePairID"].fillna("").astype(str)
+    out |= pid.isin(set(pid[out | replaced]) - {""}).values
+    return out & ~replaced
+
+
+def merge_incremental(fresh: pd.DataFrame, hist: pd.DataFrame,
+                      inc_hist: pd.DataFrame, wm: dict):
+    """
+    Merge the delta of `fresh` (new or changed records) into the stored
+    records `hist` and incidents `inc_hist`.
+
+    Duplicate pairs and incident links are searched only between delta rows
+    and the stored rows inside the delta's time span ± the matching window,
+    so cost follows the delta. Existing pair IDs never change: a stored
+    record that gains a new partner keeps its old DuplicatePairID. New pairs
+    and incidents are numbered on from the watermark; incidents joined by a
+    delta record take the lowest existing ID. Stored duplicate partners of
+    a replaced record lose their flag and pair ID and are re-paired along
+    with the delta, so an update that no longer matches leaves no stale
+    pair behind.
+
+    Returns (records, incidents, n_delta).
+    """
+    key_f, key_h = _record_key(fresh), _record_key(hist)
+    is_delta = ~(key_f + "|" + fresh["RowHash"].astype(str)) \
+                 .isin(key_h + "|" + hist["RowHash"].astype(str))
+    n_delta  = int(is_delta.sum())
+    if not n_delta:
+        print("Incremental merge: no new or updated records")
+        return hist, inc_hist, 0
+
+    replaced  = key_h.isin(key_f[is_delta]).values
+    stale_ids = set(hist.loc[replaced, "IncidentID"].astype(str))
+    orphaned  = pair_partners(hist, replaced)
+    print(f"Incremental merge: {n_delta} new/updated records "
+          f"({int(replaced.sum())} replace stored versions, "
+          f"{int(orphaned.sum())} partners re-paired)")
+
+    delta = add_onset_hours(fresh[is_delta.values].copy())
+    delta["DuplicateFlag"]   = 0
+    delta["DuplicatePairID"] = ""
+    delta["DuplicateTextSim"] = np.nan
+    delta["IncidentID"]      = ""
+    kept = hist[~replaced].assign(_new=False, _redo=orphaned[~replaced])
+    kept.loc[kept["_redo"], "DuplicateFlag"]    = 0
+    kept.loc[kept["_redo"], "DuplicatePairID"]  = ""
+    kept.loc[kept["_redo"], "DuplicateTextSim"] = np.nan
+    df = pd.concat([kept, delta.assign(_new=True, _redo=True)], ignore_index=True)
+    df = df.sort_values("Timestamp", kind="stable").reset_index(drop=True)
+    for col in ("DuplicatePairID", "IncidentID"):
+        df[col] = df[col].astype(object).fillna("")
+
+    # Stored rows the delta can still match: [min - reach, max + reach]
+    new   = df["_new"].values.astype(bool)
+    redo  = df["_redo"].values.astype(bool)
+    t     = df["OnsetHours"].values
+    reach = max(HOUR_THRESHOLD, REPEAT_HOUR_THRESHOLD)
+    t_new = t[redo][np.isfinite(t[redo])]
+    pool  = np.flatnonzero(redo)
+    if len(t_new):
+        lo = np.searchsorted(t, t_new.min() - reach, side="left")
+        hi = np.searchsorted(t, t_new.max() + reach, side="right")
+        pool = np.union1d(pool, np.arange(lo, hi))
+
+    # Cross-source pairs: new and orphaned records × everything in the window
+    d, a, sim = duplicate_pairs(df, pool[redo[pool]], pool)
+    pids = assign_pair_ids(df, d, a, sim, first=wm["next_pair"], keep_existing=True)
+
+    # Incidents: delta links, plus stored rows tied to their current incident
+    i, j, _  = incident_links(df, pool[new[pool]], pool)
+    local    = np.full(len(df), -1, dtype=np.int64)
+    local[pool] = np.arange(len(pool))
+    old_ids  = df["IncidentID"].values[pool].astype(str)
+    has      = np.flatnonzero(old_ids != "")
+    codes, _ = pd.factorize(old_ids[has])
+    anchor   = has[np.unique(codes, return_index=True)[1]][codes]
+    graph = coo_matrix((np.ones(len(i) + len(has), dtype=np.int8),
+                        (np.concatenate([local[i], has]),
+                         np.concatenate([local[j], anchor]))),
+                       shape=(len(pool), len(pool)))
+    _, labels = connected_components(graph, directed=False)
+
+    comps  = pd.unique(labels[new[pool]])  # in row order of first new record
+    member = pd.DataFrame({"comp": labels[has], "old": old_ids[has]})
+    member = member[member["comp"].isin(comps)].drop_duplicates()
+    member["num"] = pd.to_numeric(member["old"].str[4:], errors="coerce")
+    keep_id = member.sort_values("num").groupby("comp")["old"].first()
+    target  = keep_id.reindex(comps)
+    fresh_c = target.index[target.isna()]
+    first   = wm["next_incident"]
+    target[fresh_c] = [f"INC_{k:04d}" for k in range(first, first + len(fresh_c))]
+
+    rename = dict(zip(member["old"], target[member["comp"]].values))
+    rename = {k: v for k, v in rename.items() if k != v}
+    hit    = np.isin(labels, comps)
+    df.loc[pool[hit], "IncidentID"] = target[labels[hit]].values
+    if rename:
+        df["IncidentID"] = df["IncidentID"].replace(rename)
+    df["IncidentSize"] = df.groupby("IncidentID")["IncidentID"].transform("size")
+
+    affected = set(target.values) | set(rename) | stale_ids
+    rebuilt  = build_incident_table(df[df["IncidentID"].isin(affected)])
+    incidents = pd.concat([inc_hist[~inc_hist["IncidentID"].isin(affected)], rebuilt],
+                          ignore_index=True)
+    incidents = incidents.sort_values("Timestamp", kind="stable").reset_index(drop=True)
+
+    print(f"  New duplicate pairs: {len(pids)}; new incidents: {len(fresh_c)}; "
+          f"incidents merged: {len(rename)}")
+    return df.drop(columns=["_new", "_redo"]), incidents, n_delta
+
+
+# ── 9. Main ────────────────────────────────────────────────────────────────────
 def main():
-    di = load_dataint(DATAINT_F)
-    al = load_aliado(ALIADO_F)
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--excel", action="store_true",
+                        help=f"also write {EXCEL_F.name}")
+    parser.add_argument("--incremental", action="store_true",
+                        help="merge only new/updated records into the existing store")
+    parser.add_argument("--text-confirm", action="store_true",
+                        help="require description overlap for duplicates/incident links")
+    parser.add_argument("--sweep", action="store_true",
+                        help=f"only write the threshold sensitivity table ({SWEEP_F.name})")
+    args = parser.parse_args()
+
+    global TEXT_CONFIRM
+    TEXT_CONFIRM = TEXT_CONFIRM or args.text_confirm
+
+    combined = load_sources()
+    combined["RowHash"] = record_hash(combined)
 
-    combined = pd.concat([di, al], ignore_index=True)
-    combined = combined.sort_values("Timestamp").reset_index(drop=True)
-    combined = add_onset_hours(combined)
-    combined = flag_duplicates(combined)
+    if args.sweep:
+        combined = combined.sort_values("Timestamp").reset_index(drop=True)
+        table = sweep_thresholds(add_onset_hours(combined))
+        print("\nDuplicate sensitivity (pairs / flagged % of records):")
+        print(table.pivot(index="km", columns="hours", values="pairs").to_string())
+        print(table.pivot(index="km", columns="hours", values="flagged_pct").round(1).to_string())
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+        table.to_csv(SWEEP_F, index=False)
+        print(f"\nSaved: {SWEEP_F}")
+        return
+
+    wm = read_watermark(WATERMARK_F) if args.incremental else None
+    if wm and RECORDS_F.exists() and INCIDENTS_F.exists():
+        mode = "incremental"
+        combined, incidents, n_delta = merge_incremental(
+            combined, pd.read_parquet(RECORDS_F), pd.read_parquet(INCIDENTS_F), wm)
+    else:
+        if args.incremental:
+            print("No watermark/store found — running a full merge")
+        mode    = "full"
+        n_delta = len(combined)
+        combined = combined.sort_values("Timestamp").reset_index(drop=True)
+        combined = add_onset_hours(combined)
+        combined = flag_duplicates(combined)
+        combined = cluster_incidents(combined)
+        incidents = build_incident_table(combined)
 
     print(f"\nCombined dataset: {len(combined)} records total")
-    print(f"  DataInt: {(combined.Source=='DataInt').sum()}")
-    print(f"  Aliado:  {(combined.Source=='Aliado').sum()}")
+    for name, n in combined["Source"].astype(str).value_counts().items():
+        print(f"  {name + ':':8s} {n}")
     print(f"  Duplicate-flagged: {combined.DuplicateFlag.sum()}")
+    print(f"  Canonical incidents: {len(incidents)}")
     print(f"  States covered: {combined.State.nunique()}")
     print(f"  Severity distribution:\n{combined.Severity.value_counts().sort_index()}")
 
     OUT_DIR.mkdir(parents=True, exist_ok=True)
-    with pd.ExcelWriter(OUTPUT_F, engine="openpyxl") as writer:
-        combined.to_excel(writer, sheet_name="Combined Incidents", index=False)
-        # Summary sheet
-        summary = combined.groupby(["Source", "Severity"]).size().unstack(fill_value=0)
-        summary.to_excel(writer, sheet_name="Summary by Severity")
-
-    print(f"\nSaved: {OUTPUT_F}")
+    print()
+    combined  = write_store(combined,  RECORD_SCHEMA,   RECORDS_F)
+    incidents = write_store(incidents, INCIDENT_SCHEMA, INCIDENTS_F)
+    write_watermark(WATERMARK_F, combined, mode, n_delta)
+    if args.excel:
+        export_excel(combined, incidents, EXCEL_F)
 
 
 if __name__ == "__main__":
@@ -4,24 +4,41 @@
 Spatial and spatio-temporal statistics on the combined incident dataset.
 
 Analyses performed:
-    1. Global Moran's I — severity and onset time (KNN-8 and DistanceBand-250km)
+    1. Global Moran's I — severity and onset time (KNN-8 and 250km great-circle band)
     2. LISA (Local Moran's I) — severity and onset time, 999 permutations
-    3. Knox space-time interaction test — 999 permutations
-    4. Highway diffusion — Spearman correlation along 5 federal highway corridors
-    5. Spatial lag regression — severity ~ spatial lag (severity)
+       (batched permutation inference on a process pool)
+    3. Knox space-time interaction test — 999 permutations, all thresholds
+       per permutation over a sparse pair list, on a process pool
+       + Jacquez k-NN and Mantel tests on sparse space/time k-NN graphs
+    4. Space-time scan — Kulldorff space-time permutation scan over grid-cell
+       circles × OnsetHours windows, 999 Monte Carlo replicates
+    5. Sliding-window LISA — severity hotspots per 6-hour OnsetHours window,
+       KNN weights updated incrementally as events enter and leave
+    6. Highway diffusion — Spearman correlation along 5 federal highway corridors
+       (polylines through 03 graph nodes, STRtree buffer assignment,
+       position = linear distance along the route)
+    7. Spatial lag regression — SAR lag model, severity ~ ρ·W·severity
+       + Source + SubtypeNorm, concentrated ML on sparse weights
+       (eigenvalue or Chebyshev log-determinant)
+    8. Kernel density hotspots — Gaussian KDE on a 0.05° national grid by FFT,
+       counts, severity-weighted and time-decayed severity surfaces
 
 Outputs:
     figures/fig1_lisa.png
     figures/fig2_moran.png
+    data/lisa_windows.csv           (per-window LISA cluster table)
+    data/kde_surfaces.npz           (KDE hotspot grids, overlaid by 04)
     (printed tables of all statistics)
+    data/weights_cache/<hash>.npz   (cached spatial weights, reused across runs)
 
 Usage:
     python code/02_spatial_statistics.py
 
 Requirements:
-    pandas, numpy, scipy, libpysal, esda, matplotlib
+    pandas, pyarrow, numpy, scipy, libpysal, esda, shapely, matplotlib, networkx
 """
 
+import hashlib
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -30,56 +47,371 @@ import pandas as pd
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from scipy.stats import spearmanr
+from scipy import sparse
+from scipy.optimize import minimize_scalar
+from scipy.signal import fftconvolve
+from scipy.spatial import cKDTree
+from scipy.special import xlogy
+from scipy.stats import chi2, norm, spearmanr
 
 import libpysal
+import shapely
+from esda.crand import vec_permutations
 from esda.moran import Moran, Moran_Local
 
 # ── Paths ─────────────────────────────────────────────────────────────────────
 ROOT     = Path(__file__).resolve().parent.parent
-DATA_F   = ROOT / "data" / "mexico_incidents_COMBINED_feb22-23_2026.xlsx"
+DATA_F   = ROOT / "data" / "mexico_incidents_INCIDENTS_feb22-23_2026.parquet"
+# raw records instead of canonical incidents:
+#   ROOT / "data" / "mexico_incidents_COMBINED_feb22-23_2026.parquet"
+COLUMNS  = ["Latitude", "Longitude", "Severity", "OnsetHours", "Source", "SubtypeNorm"]
 FIG_DIR  = ROOT / "figures"
 FIG_DIR.mkdir(parents=True, exist_ok=True)
 
 PERMUTATIONS = 999
 SEED         = 42
 
+# Spatial weights: name → (kind, parameter). Built once per coordinate set,
+# kept in memory and cached on disk as binary sparse matrices.
+# Distance-based specs take great-circle km; kernels are
+# ("kernel", bandwidth_km, "triangular" | "gaussian" | "uniform").
+BAND_KM      = 250.0
+WEIGHT_SPECS = {
+    "KNN-8":                  ("knn",  8),
+    f"DistBand-{BAND_KM:g}km": ("band", BAND_KM),
+}
+EARTH_RADIUS_KM = 6371.0088
+WEIGHTS_DIR  = ROOT / "data" / "weights_cache"
+
 
 # ── Load data ─────────────────────────────────────────────────────────────────
 def load_data() -> pd.DataFrame:
-    df = pd.read_excel(DATA_F, sheet_name="Combined Incidents")
+    df = pd.read_parquet(DATA_F, columns=COLUMNS)
     df = df.dropna(subset=["Latitude", "Longitude", "Severity", "OnsetHours"])
     df = df[df["Latitude"].between(14, 33) & df["Longitude"].between(-120, -86)]
     print(f"Records loaded for spatial analysis: {len(df)}")
     return df
 
 
+# ── Spatial weights cache ─────────────────────────────────────────────────────
+_WEIGHTS = {}
+WEIGHTS_VERSION = 2       # bump when build_weights or KERNELS change; old .npz are ignored
+
+
+def weights_key(coords: np.ndarray, spec: tuple) -> str:
+    h = hashlib.sha1(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+    h.update(f"v{WEIGHTS_VERSION}:{spec!r}".encode())
+    return h.hexdigest()[:16]
+
+
+def _unit_xyz(coords: np.ndarray) -> np.ndarray:
+    lon, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    return np.column_stack([np.cos(lat) * np.cos(lon),
+                            np.cos(lat) * np.sin(lon),
+                            np.sin(lat)])
+
+
+def haversine_pairs(coords: np.ndarray, km: float):
+    """
+    Symmetric (i, j, great-circle km) lists of all pairs within km, from a
+    k-d tree on unit-sphere points (chord radius ↔ arc length is monotone).
+    """
+    chord = 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+    tree  = cKDTree(_unit_xyz(coords))
+    ij    = tree.query_pairs(chord * (1 + 1e-9), output_type="ndarray")
+    i, j  = ij[:, 0], ij[:, 1]
+    xyz   = tree.data
+    c     = np.linalg.norm(xyz[i] - xyz[j], axis=1)
+    d     = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(c / 2, 0, 1))
+    keep  = d <= km
+    i, j, d = i[keep], j[keep], d[keep]
+    return np.concatenate([i, j]), np.concatenate([j, i]), np.concatenate([d, d])
+
+
+KERNELS = {
+    "triangular": lambda u: 1 - u,
+    "uniform":    lambda u: np.ones_like(u),
+    "gaussian":   lambda u: np.exp(-0.5 * (3 * u) ** 2),   # bandwidth = 3σ
+}
+
+
+def distance_weights(coords: np.ndarray, km: float, kernel: str = None):
+    """
+    n × n CSR weights on great-circle km, no self-weights: binary within km,
+    or KERNELS[kernel](d / km). Memory grows with the number of neighbours.
+    """
+    i, j, d = haversine_pairs(coords, km)
+    w = np.ones_like(d) if kernel is None else KERNELS[kernel](d / km)
+    n = len(coords)
+    return sparse.csr_matrix((w, (i, j)), shape=(n, n))
+
+
+def build_weights(coords: np.ndarray, spec: tuple):
+    kind, *param = spec
+    if kind == "knn":
+        return libpysal.weights.KNN.from_array(coords, k=param[0])
+    if kind == "band":
+        csr = distance_weights(coords, param[0])
+    elif kind == "kernel":
+        csr = distance_weights(coords, param[0], kernel=param[1])
+    else:
+        raise ValueError(f"unknown weights kind: {kind!r}")
+    return libpysal.weights.WSP(csr).to_W(silence_warnings=True)
+
+
+def get_weights(coords: np.ndarray, name: str):
+    """
+    Row-standardised weights for WEIGHT_SPECS[name], built once per
+    coordinate set: looked up in memory, then in WEIGHTS_DIR
+    (<key>.npz, CSR of the spec's weight values — 1 for KNN and distance
+    bands, kernel values for kernels — before row-standardising), and only
+    then built from scratch. The key covers coordinates, spec and
+    WEIGHTS_VERSION.
+    """
+    key = weights_key(coords, WEIGHT_SPECS[name])
+    if key not in _WEIGHTS:
+        path = WEIGHTS_DIR / f"{key}.npz"
+        if path.exists():
+            W = libpysal.weights.WSP(sparse.load_npz(path)).to_W(
+                silence_warnings=True)
+        else:
+            W = build_weights(coords, WEIGHT_SPECS[name])
+            WEIGHTS_DIR.mkdir(parents=True, exist_ok=True)
+            sparse.save_npz(path, W.sparse.tocsr())
+        W.transform = "r"
+        _WEIGHTS[key] = W
+    return _WEIGHTS[key]
+
+
+# ── Permutation inference ─────────────────────────────────────────────────────
+INFER_WORKERS = None      # process pool size (None = all cores, 1 = in-process)
+INFER_CHUNK   = 4096      # LISA locations per task
+
+# Sequential Monte Carlo (Besag & Clifford 1991): with an alpha, stop drawing
+# once h = sequential_h(alpha) simulated statistics reach the observed one
+# (both tails for the folded Moran / LISA p-values). The p < alpha decision
+# then matches the full run; early-stopped p-values are (h + 1) / (draws + 1),
+# which is never below alpha.
+SEQUENTIAL_ALPHA = None   # e.g. 0.05; None = always run every permutation
+SEQ_BLOCK        = 64     # LISA draws evaluated per step
+SEQ_CELLS        = 1 << 22  # max locations × draws × neighbours per step
+
+
+def sequential_h(alpha: float, permutations: int) -> int:
+    """Exceedance count from which p = (g + 1) / (permutations + 1) >= alpha."""
+    return max(int(np.ceil(alpha * (permutations + 1) - 1)), 1)
+
+
+def _moran_sims(z, adj, s0, z2ss, permutations, seed, I=None, h=None):
+    """
+    esda's Moran permutation loop, drawn from RandomState(seed). With h,
+    stops once h draws fall on each side of the observed I.
+    """
+    rs, n = np.random.RandomState(seed), len(z)
+    sim = np.empty(permutations)
+    above = below = 0
+    for k in range(permutations):
+        zp     = z[rs.permutation(n)]
+        sim[k] = n / s0 * (zp * (adj @ zp)).sum() / z2ss
+        if h:
+            above += sim[k] >= I
+            below += sim[k] < I
+            if min(above, below) >= h:
+                return sim[:k + 1]
+    return sim
+
+
+def _lisa_chunk(start, stop, z, indptr, weights, self_w, ids, scaling, Is):
+    """
+    Conditional randomisation for locations start..stop, as in esda's
+    crand: location i draws its neighbours from the other n - 1 values
+    using the shared id matrix `ids`. Returns the folded pseudo p-value
+    and the mean / sd of the simulated local statistics.
+    """
+    perms = ids.shape[0]
+    rl = np.empty((stop - start, perms))
+    for r, i in enumerate(range(start, stop)):
+        w = weights[indptr[i]:indptr[i + 1]]
+        if len(w) == 0:                             # island
+            w = np.zeros(1, dtype=z.dtype)
+        k     = ids[:, :len(w)]
+        zrand = z[k + (k >= i)]                     # ids index z without z[i]
+        rl[r] = z[i] * (zrand @ w + self_w[i] * z[i]) * scaling
+    sim    = rl.T
+    larger = (sim >= Is[start:stop]).sum(0)
+    low    = (perms - larger) < larger
+    larger[low] = perms - larger[low]
+    return ((larger + 1.0) / (perms + 1.0), sim.mean(axis=0), sim.std(axis=0),
+            np.full(stop - start, perms))
+
+
+def _lisa_chunk_seq(start, stop, z, indptr, weights, self_w, ids, scaling, Is, h):
+    """
+    Sequential version of `_lisa_chunk`: still-undecided locations with the
+    same number of neighbours draw the next SEQ_BLOCK rows of `ids`
+    together, and each stops at the first draw that leaves h simulated
+    values on each side of its observed I. Per-draw values are computed
+    exactly as in `_lisa_chunk`. Also returns the draws used per location.
+    """
+    perms, m = ids.shape[0], stop - start
+    card = np.diff(indptr[start:stop + 1])
+    ge, lt, used = (np.zeros(m, dtype=np.int64) for _ in range(3))
+    s1, s2 = np.zeros(m), np.zeros(m)
+    done   = np.zeros(m, dtype=bool)
+
+    for c in np.unique(card):
+        grp = np.flatnonzero(card == c)
+        loc = start + grp
+        if c == 0:                                  # island: one zero weight
+            c, Wg = 1, np.zeros((len(grp), 1), dtype=z.dtype)
+        else:
+            Wg = weights[indptr[loc][:, None] + np.arange(c)]
+        step = max(1, SEQ_CELLS // (SEQ_BLOCK * c))
+        for b in range(0, perms, SEQ_BLOCK):
+            k   = ids[b:b + SEQ_BLOCK, :c]
+            act = np.flatnonzero(~done[grp])
+            for sl in range(0, len(act), step):
+                a  = act[sl:sl + step]
+                i  = loc[a]
+                K  = k[None] + (k[None] >= i[:, None, None])   # ids skip z[i]
+                rs = z[i, None] * (np.matmul(z[K], Wg[a, :, None])[..., 0]
+                                   + (self_w[i] * z[i])[:, None]) * scaling
+                g  = np.cumsum(rs >= Is[i, None], axis=1) + ge[grp[a], None]
+                l  = np.cumsum(rs < Is[i, None], axis=1) + lt[grp[a], None]
+                hit   = np.minimum(g, l) >= h
+                stops = hit.any(axis=1)
+                last  = np.where(stops, hit.argmax(axis=1), len(k) - 1)
+                keep  = np.arange(len(k))[None] <= last[:, None]
+                r, o  = np.arange(len(a)), grp[a]
+                s1[o]   += (rs * keep).sum(axis=1)
+                s2[o]   += (rs * rs * keep).sum(axis=1)
+                used[o] += last + 1
+                ge[o], lt[o] = g[r, last], l[r, last]
+                done[o] = stops
+            if done[grp].all():
+                break
+
+    p    = np.where(done, (h + 1.0) / (used + 1.0),
+                    (np.minimum(ge, lt) + 1.0) / (perms + 1.0))
+    mean = s1 / used
+    return p, mean, np.sqrt(np.maximum(s2 / used - mean * mean, 0)), used
+
+
+def _run_task(task):
+    fn, args = task
+    return fn(*args)
+
+
+def permutation_inference(jobs, permutations: int = PERMUTATIONS, seed: int = SEED,
+                          workers=INFER_WORKERS, alpha=SEQUENTIAL_ALPHA) -> list:
+    """
+    Batch permutation inference for [("moran" | "lisa", y, W), ...].
+    Returns esda Moran / Moran_Local objects, in job order, carrying the
+    same p_sim, EI_sim, seI_sim, VI_sim, z_sim and p_z_sim as
+    Moran(..., permutations) after np.random.seed(seed) and
+    Moran_Local(..., permutations, seed=seed); simulated values are not kept.
+
+    Every Moran job replays the same RandomState(seed) permutation stream,
+    and LISA jobs on the same weights share one conditional-randomisation
+    id matrix. Tasks (one per Moran job, one per INFER_CHUNK LISA
+    locations) run on a process pool; all draws are fixed up front, so
+    results do not depend on the number of workers.
+
+    With `alpha`, each statistic stops early once its p >= alpha is certain
+    (see SEQUENTIAL_ALPHA); `n_perm` on each object (per location for
+    LISA) records the draws used.
+    """
+    h = sequential_h(alpha, permutations) if alpha else None
+    objs, tasks, ids = [], [], {}
+    for stat, y, W in jobs:
+        if stat == "moran":
+            mi  = Moran(y, W, permutations=0)
+            z   = mi.y - mi.y.mean()
+            objs.append(mi)
+            tasks.append([(_moran_sims, (z, W.sparse.tocsr(), W.s0, mi.z2ss,
+                                         permutations, seed, mi.I, h))])
+            continue
+        li  = Moran_Local(y, W, permutations=0)
+        adj = W.sparse.tocsr(copy=True)
+        self_w = adj.diagonal()
+        adj.setdiag(0)
+        adj.eliminate_zeros()
+        n, card = li.n, np.diff(adj.indptr)
+        key = (id(W), n)
+        if key not in ids:
+            ids[key] = vec_permutations(card.max(), n, permutations, seed)
+        args = (li.z, adj.indptr, adj.data.astype(li.z.dtype), self_w, ids[key],
+                (n - 1) / (li.z * li.z).sum(), li.Is)
+        objs.append(li)
+        if h:
+            tasks.append([(_lisa_chunk_seq, (s, min(s + INFER_CHUNK, n)) + args + (h,))
+                          for s in range(0, n, INFER_CHUNK)])
+        else:
+            tasks.append([(_lisa_chunk, (s, min(s + INFER_CHUNK, n)) + args)
+                          for s in range(0, n, INFER_CHUNK)])
+
+    flat = [t for ts in tasks for t in ts]
+    if workers == 1:
+        out = list(map(_run_task, flat))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            out = list(ex.map(_run_task, flat))
+
+    k = 0
+    for obj, ts in zip(objs, tasks):
+        res, k = out[k:k + len(ts)], k + len(ts)
+        obj.permutations = permutations
+        if isinstance(obj, Moran):
+            sim    = res[0]
+            larger = (sim >= obj.I).sum()
+            if (permutations - larger) < larger:
+                larger = permutations - larger
+            obj.sim     = sim
+            obj.n_perm  = len(sim)
+            if len(sim) < permutations:
+                obj.p_sim = (h + 1.0) / (len(sim) + 1.0)
+            else:
+                obj.p_sim = (larger + 1.0) / (permutations + 1.0)
+            obj.EI_sim  = sim.sum() / len(sim)
+            obj.seI_sim = sim.std()
+            obj.VI_sim  = obj.seI_sim ** 2
+            with np.errstate(divide="ignore"):
+                obj.z_sim = (obj.I - obj.EI_sim) / obj.seI_sim
+            obj.p_z_sim = norm.sf(obj.z_sim) if obj.z_sim > 0 else norm.cdf(obj.z_sim)
+        else:
+            obj.p_sim, obj.EI_sim, obj.seI_sim, obj.n_perm = (np.concatenate(c)
+                                                              for c in zip(*res))
+            obj.VI_sim = obj.seI_sim * obj.seI_sim
+            with np.errstate(divide="ignore"):
+                obj.z_sim = (obj.Is - obj.EI_sim) / obj.seI_sim
+            obj.p_z_sim = norm.sf(np.abs(obj.z_sim))
+            obj.sim = obj.rlisas = None
+    return objs
+
+
 # ── 1. Global Moran's I ───────────────────────────────────────────────────────
-def run_moran(df: pd.DataFrame):
+def run_moran(df: pd.DataFrame, coords: np.ndarray) -> dict:
     """
     Compute Global Moran's I for severity and onset time under two
-    weight matrices: KNN-8 and DistanceBand-250km.
+    weight matrices: KNN-8 and a BAND_KM great-circle distance band.
+    Returns {(weights name, variable): Moran} for reuse by the plots.
     """
-    coords = df[["Longitude", "Latitude"]].values
-
     print("\n── Global Moran's I ──────────────────────────────────────────────")
 
-    for w_name, W in [
-        ("KNN-8",          libpysal.weights.KNN.from_array(coords, k=8)),
-        ("DistBand-250km", libpysal.weights.DistanceBand.from_array(
-                               coords, threshold=2.25, binary=True)),  # ~250km in degrees
-    ]:
-        W.transform = "r"
+    keys = [(w_name, var_name) for w_name in WEIGHT_SPECS
+            for var_name in ("Severity", "OnsetHours")]
+    fits = permutation_inference([("moran", df[v].values, get_weights(coords, w))
+                                  for w, v in keys])
 
-        for var_name, y in [("Severity", df["Severity"].values),
-                             ("OnsetHours", df["OnsetHours"].values)]:
-            mi = Moran(y, W, permutations=PERMUTATIONS, seed=SEED)
-            sig = "**" if mi.p_sim < 0.01 else ("*" if mi.p_sim < 0.05 else "n.s.")
-            print(f"  [{w_name}] {var_name:12s}:  I={mi.I:.4f}  z={mi.z_norm:.2f}  "
-                  f"p={mi.p_sim:.4f} {sig}")
+    results = dict(zip(keys, fits))
+    for (w_name, var_name), mi in results.items():
+        sig = "**" if mi.p_sim < 0.01 else ("*" if mi.p_sim < 0.05 else "n.s.")
+        print(f"  [{w_name}] {var_name:12s}:  I={mi.I:.4f}  z={mi.z_norm:.2f}  "
+              f"p={mi.p_sim:.4f} {sig}  (perms={mi.n_perm})")
 
-    return coords
+    return results
 
 
 # ── 2. LISA ───────────────────────────────────────────────────────────────────
@@ -88,8 +420,7 @@ def run_lisa(df: pd.DataFrame, coords: np.ndarray) -> pd.DataFrame:
     Compute LISA (Local Moran's I) for severity and onset time.
     Appends cluster labels to the dataframe and generates figure.
     """
-    W = libpysal.weights.KNN.from_array(coords, k=8)
-    W.transform = "r"
+    W = get_weights(coords, "KNN-8")
 
     print("\n── LISA Clusters ─────────────────────────────────────────────────")
 
@@ -102,9 +433,10 @@ def run_lisa(df: pd.DataFrame, coords: np.ndarray) -> pd.DataFrame:
     cluster_labels = {0: "n.s.", 1: "HH (hotspot)", 2: "LL (coldspot)",
                       3: "LH (outlier)", 4: "HL (outlier)"}
 
-    for ax, (var_name, y) in zip(axes, [("Severity", df["Severity"].values),
-                                         ("OnsetHours", df["OnsetHours"].values)]):
-        lisa = Moran_Local(y, W, permutations=PERMUTATIONS, seed=SEED)
+    variables = ["Severity", "OnsetHours"]
+    fits = permutation_inference([("lisa", df[v].values, W) for v in variables])
+
+    for ax, var_name, lisa in zip(axes, variables, fits):
 
         # Assign cluster type: 0=ns, 1=HH, 2=LL, 3=LH, 4=HL
         cluster = np.zeros(len(df), dtype=int)
@@ -125,7 +457,9 @@ def run_lisa(df: pd.DataFrame, coords: np.ndarray) -> pd.DataFrame:
         n_hh = (cluster == 1).sum()
         n_ll = (cluster == 2).sum()
         print(f"  {var_name}: HH={n_hh}, LL={n_ll}, "
-              f"LH={(cluster==3).sum()}, HL={(cluster==4).sum()}")
+              f"LH={(cluster==3).sum()}, HL={(cluster==4).sum()}  "
+              f"(perms/location: mean={lisa.n_perm.mean():.0f}, "
+              f"total={lisa.n_perm.sum():,})")
 
         ax.set_title(f"LISA — {var_name}", fontsize=12, fontweight="bold")
         ax.set_xlabel("Longitude"); ax.set_ylabel("Latitude")
@@ -145,108 +479,695 @@ def run_lisa(df: pd.DataFrame, coords: np.ndarray) -> pd.DataFrame:
 
 
 # ── 3. Knox Space-Time Interaction ────────────────────────────────────────────
-def run_knox(df: pd.DataFrame, coords: np.ndarray):
+KNOX_CONFIGS = [(10, 2), (10, 6), (50, 2), (50, 6), (100, 2), (100, 6), (300, 2)]
+KNOX_WORKERS = None       # process pool size (None = all cores, 1 = in-process)
+KNOX_BATCH   = 50         # permutations per task; fixes the per-task seed streams
+KNOX_BLOCK   = 1 << 22    # pairs per vectorised block (bounds temporary memory)
+
+_KNOX = {}                # pair list shared with pool workers
+
+
+def knox_pairs(coords: np.ndarray, max_km: float):
+    """
+    All event pairs (i < j) within max_km, as int32 index arrays plus their
+    distance in km (degrees × 111, as in the original dense test).
+    """
+    tree = cKDTree(coords)
+    ij   = tree.query_pairs(max_km / 111.0 * (1 + 1e-9), output_type="ndarray")
+    i, j = ij[:, 0].astype(np.int32), ij[:, 1].astype(np.int32)
+    km   = np.sqrt(((coords[i] - coords[j]) ** 2).sum(axis=1)) / (1 / 111.0)
+    keep = km <= max_km
+    return i[keep], j[keep], km[keep]
+
+
+def knox_counts(i, j, s_bin, t, t_grid, n_d) -> np.ndarray:
+    """
+    Close-pair counts for every (distance, time) threshold on the grid:
+    out[a, b] = #pairs with distance <= d_grid[a] and |Δt| <= t_grid[b].
+    `s_bin` is each pair's smallest admitting distance bin.
+    """
+    n_t    = len(t_grid)
+    counts = np.zeros(n_d * (n_t + 1), dtype=np.int64)
+    for s in range(0, len(i), KNOX_BLOCK):
+        blk = slice(s, s + KNOX_BLOCK)
+        dt    = np.abs(t[i[blk]] - t[j[blk]])
+        t_bin = s_bin[blk] * np.int16(n_t + 1)
+        for g in t_grid:                      # smallest admitting time bin
+            t_bin += dt > g
+        counts += np.bincount(t_bin, minlength=n_d * (n_t + 1))
+    counts = counts.reshape(n_d, n_t + 1)[:, :n_t]
+    return counts.cumsum(axis=0).cumsum(axis=1)
+
+
+def _knox_init(i, j, s_bin, t, t_grid, n_d):
+    _KNOX.update(i=i, j=j, s_bin=s_bin, t=t, t_grid=t_grid, n_d=n_d)
+
+
+def _knox_batch(seed, n_perm: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    k   = _KNOX
+    return np.stack([knox_counts(k["i"], k["j"], k["s_bin"], rng.permutation(k["t"]),
+                                 k["t_grid"], k["n_d"])
+                     for _ in range(n_perm)])
+
+
+def run_knox(df: pd.DataFrame, coords: np.ndarray, configs=KNOX_CONFIGS,
+             permutations: int = PERMUTATIONS, workers=KNOX_WORKERS,
+             alpha=SEQUENTIAL_ALPHA) -> pd.DataFrame:
     """
     Knox test: are events closer in space AND time than expected by chance?
-    Tests multiple (d_km, t_h) thresholds. Uses 999 random permutations.
+    Tests multiple (d_km, t_h) thresholds against the same random
+    permutations of onset times.
+
+    Pairs within the largest distance are found once with a k-d tree, so
+    each permutation is one pass over that pair list for all configs.
+    Permutations run in batches of KNOX_BATCH on a process pool; batch b
+    draws from SeedSequence(SEED).spawn()[b], so results do not depend
+    on the number of workers. With `alpha`, batches stop once every config
+    has h = sequential_h(alpha) permuted counts >= its observed count.
     """
     print("\n── Knox Space-Time Interaction ───────────────────────────────────")
 
-    from scipy.spatial.distance import cdist as sp_cdist
-
-    n = len(df)
-    geo_km   = sp_cdist(coords, coords) / (1 / 111.0)  # degrees → km
-    time_h   = np.abs(df["OnsetHours"].values[:, None]
-                    - df["OnsetHours"].values[None, :])
-
-    # Observed counts
-    configs = [(10, 2), (10, 6), (50, 2), (50, 6), (100, 2), (100, 6), (300, 2)]
-    np.random.seed(SEED)
-
-    print(f"  {'d_km':>6} {'t_h':>5} {'Obs':>8} {'Exp':>8} {'Ratio':>7} {'p':>7}")
-    for d_km, t_h in configs:
-        close_space = geo_km  <= d_km
-        close_time  = time_h  <= t_h
-        np.fill_diagonal(close_space, False)
-        np.fill_diagonal(close_time,  False)
-
-        obs = (close_space & close_time).sum() // 2
-
-        # Permutation: shuffle timestamps
-        perm_counts = []
-        for _ in range(PERMUTATIONS):
-            perm_times = df["OnsetHours"].values.copy()
-            np.random.shuffle(perm_times)
-            pt = np.abs(perm_times[:, None] - perm_times[None, :])
-            np.fill_diagonal(pt, np.inf)
-            perm_counts.append((close_space & (pt <= t_h)).sum() // 2)
-
-        exp  = np.mean(perm_counts)
-        ratio = obs / exp if exp > 0 else np.inf
-        p_val = (np.sum(np.array(perm_counts) >= obs) + 1) / (PERMUTATIONS + 1)
+    d_grid = np.unique([d for d, _ in configs]).astype(float)
+    t_grid = np.unique([h for _, h in configs]).astype(float)
+    t      = df["OnsetHours"].values.astype(float)
+
+    i, j, km = knox_pairs(coords, d_grid[-1])
+    s_bin    = np.searchsorted(d_grid, km, side="left").astype(np.int8)
+    args     = (i, j, s_bin, t, t_grid, len(d_grid))
+    print(f"  Pairs within {d_grid[-1]:g} km: {len(i):,}")
+
+    obs   = knox_counts(i, j, s_bin, t, t_grid, len(d_grid))
+    sizes = [min(KNOX_BATCH, permutations - s)
+             for s in range(0, permutations, KNOX_BATCH)]
+    seeds = np.random.SeedSequence(SEED).spawn(len(sizes))
+    cells = tuple(np.array([(np.searchsorted(d_grid, d), np.searchsorted(t_grid, th))
+                            for d, th in configs]).T)
+    h     = sequential_h(alpha, permutations) if alpha else None
+
+    ex = None
+    if workers == 1:
+        _knox_init(*args)
+        batches = map(_knox_batch, seeds, sizes)
+    else:
+        ex = ProcessPoolExecutor(max_workers=workers, initializer=_knox_init,
+                                 initargs=args)
+        batches = ex.map(_knox_batch, seeds, sizes)
+    perm, ge = [], np.zeros_like(obs)
+    for batch in batches:
+        perm.append(batch)
+        ge += (batch >= obs).sum(axis=0)
+        if h and (ge[cells] >= h).all():
+            break
+    if ex is not None:
+        ex.shutdown(cancel_futures=True)
+    perm = np.concatenate(perm)
+
+    rows = []
+    print(f"  {'d_km':>6} {'t_h':>5} {'Obs':>8} {'Exp':>8} {'Ratio':>7} {'p':>7} "
+          f"{'perms':>6}")
+    for (d_km, t_h), a, b in zip(configs, *cells):
+        o, pc  = obs[a, b], perm[:, a, b]
+        stop   = np.flatnonzero(np.cumsum(pc >= o) >= h)[:1] if h else []
+        if len(stop):
+            pc    = pc[:stop[0] + 1]
+            p_val = (h + 1) / (len(pc) + 1)
+        else:
+            p_val = (np.sum(pc >= o) + 1) / (permutations + 1)
+        exp    = pc.mean()
+        ratio  = o / exp if exp > 0 else np.inf
+        sig = "**" if p_val < 0.01 else ("*" if p_val < 0.05 else "n.s.")
+        print(f"  {d_km:>6} {t_h:>5} {o:>8} {exp:>8.1f} {ratio:>7.3f} "
+              f"{p_val:>7.4f} {len(pc):>6} {sig}")
+        rows.append({"d_km": d_km, "t_h": t_h, "obs": o, "exp": exp,
+                     "ratio": ratio, "p": p_val, "n_perm": len(pc)})
+    return pd.DataFrame(rows)
+
+
+# Threshold-free space-time interaction on sparse k-NN graphs.
+JACQUEZ_K = [1, 3, 5, 10, 20]   # neighbour counts reported by the Jacquez test
+MANTEL_K  = 20                   # spatial k-NN graph whose pairs enter the Mantel r
+
+_STKNN = {}               # k-NN tables shared with pool workers
+
+
+def knn_graph(x: np.ndarray, k: int):
+    """
+    (nbr, dist) arrays of shape (n, k): each row's k nearest other rows
+    of `x`, closest first. Self is dropped even when hidden by ties.
+    """
+    d, j = cKDTree(x).query(x, k=k + 1)
+    own  = j == np.arange(len(x))[:, None]
+    own[~own.any(axis=1), -1] = True
+    return j[~own].reshape(-1, k), d[~own].reshape(-1, k)
+
+
+def stknn_stats(perm, rows, s_nbr, t_keys, t_rank, k_max, i, j, d) -> np.ndarray:
+    """
+    Jacquez counts for k = 1..k_max followed by the Mantel r, with event
+    e carrying the onset time of event perm[e].
+
+    Jacquez J_k counts ordered pairs (e, f) where f is among e's k nearest
+    in space and in time. Time neighbours are tabulated once on the
+    observed times as sorted keys a·n + b with their rank; under a
+    permutation, f is e's r-th time neighbour iff perm[e]·n + perm[f] is
+    such a key. Pairs are binned by the larger of their two ranks, so one
+    pass gives every k. Mantel r is the Pearson correlation of km and
+    |Δt| over the spatial k-NN pairs (i, j, d).
+    """
+    n     = len(perm)
+    keys  = perm[rows] * np.int64(n) + perm[s_nbr]
+    pos   = np.minimum(np.searchsorted(t_keys, keys), len(t_keys) - 1)
+    hit   = t_keys[pos] == keys
+    r     = np.maximum(np.arange(1, s_nbr.shape[1] + 1), t_rank[pos])[hit]
+    jacq  = np.bincount(r, minlength=k_max + 1)[1:].cumsum()
+
+    t     = _STKNN["t"][perm]
+    dt    = np.abs(t[i] - t[j])
+    dc    = dt - dt.mean()
+    sd    = np.sqrt((dc ** 2).sum() * ((d - d.mean()) ** 2).sum())
+    r_m   = (dc * (d - d.mean())).sum() / sd if sd > 0 else 0.0
+    return np.append(jacq.astype(float), r_m)
+
+
+def _stknn_init(t, s_nbr, t_keys, t_rank, i, j, d):
+    n, k = s_nbr.shape
+    _STKNN.update(t=t, rows=np.repeat(np.arange(n), k).reshape(n, k), s_nbr=s_nbr,
+                  t_keys=t_keys, t_rank=t_rank, k_max=k, i=i, j=j, d=d)
+
+
+def _stknn_batch(seed, n_perm: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    k   = _STKNN
+    n   = len(k["t"])
+    return np.stack([stknn_stats(rng.permutation(n), k["rows"], k["s_nbr"],
+                                 k["t_keys"], k["t_rank"], k["k_max"],
+                                 k["i"], k["j"], k["d"])
+                     for _ in range(n_perm)])
+
+
+def run_knn_interaction(df: pd.DataFrame, coords: np.ndarray, ks=JACQUEZ_K,
+                        mantel_k: int = MANTEL_K, permutations: int = PERMUTATIONS,
+                        workers=KNOX_WORKERS, alpha=SEQUENTIAL_ALPHA) -> pd.DataFrame:
+    """
+    Jacquez k-NN and Mantel space-time interaction tests.
+
+    Both use sparse k-NN tables (great-circle in space, |Δt| in time), so
+    memory and work per permutation are O(n·k) rather than O(n²). Onset
+    times are permuted over locations in KNOX_BATCH batches on a process
+    pool with the same seed streams and `alpha` stopping rule as run_knox.
+    Mantel r is one-sided: larger r = events near in space are near in time.
+    """
+    print("\n── Space-Time k-NN Interaction (Jacquez, Mantel) ─────────────────")
+
+    t     = df["OnsetHours"].values.astype(float)
+    n     = len(t)
+    k_max = min(max(max(ks), mantel_k), n - 1)
+    ks    = [k for k in ks if k <= k_max]
+
+    s_nbr, chord = knn_graph(_unit_xyz(coords), k_max)
+    t_nbr, _     = knn_graph(t[:, None], k_max)
+    t_keys       = (np.arange(n)[:, None] * np.int64(n) + t_nbr).ravel()
+    order        = np.argsort(t_keys)
+    t_keys       = t_keys[order]
+    t_rank       = np.tile(np.arange(1, k_max + 1), n)[order]
+
+    # Mantel pairs: the undirected spatial k-NN graph, each pair once
+    mk   = min(mantel_k, k_max)
+    a, b = np.repeat(np.arange(n), mk), s_nbr[:, :mk].ravel()
+    _, first = np.unique(np.minimum(a, b) * np.int64(n) + np.maximum(a, b),
+                         return_index=True)
+    ij   = np.column_stack([a[first], b[first]])
+    km   = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord[:, :mk].ravel()[first] / 2, 1))
+    args = (t, s_nbr, t_keys, t_rank, ij[:, 0], ij[:, 1], km)
+    print(f"  k-NN tables: k={k_max}, {n * k_max:,} space and time neighbours; "
+          f"Mantel pairs (k={mk}): {len(ij):,}")
+
+    _stknn_init(*args)
+    obs   = stknn_stats(np.arange(n), *(_STKNN[x] for x in
+                        ("rows", "s_nbr", "t_keys", "t_rank", "k_max", "i", "j", "d")))
+    cols  = [k - 1 for k in ks] + [k_max]
+    sizes = [min(KNOX_BATCH, permutations - s)
+             for s in range(0, permutations, KNOX_BATCH)]
+    seeds = np.random.SeedSequence(SEED).spawn(len(sizes))
+    h     = sequential_h(alpha, permutations) if alpha else None
+
+    ex = None
+    if workers == 1:
+        batches = map(_stknn_batch, seeds, sizes)
+    else:
+        ex = ProcessPoolExecutor(max_workers=workers, initializer=_stknn_init,
+                                 initargs=args)
+        batches = ex.map(_stknn_batch, seeds, sizes)
+    perm, ge = [], np.zeros_like(obs)
+    for batch in batches:
+        perm.append(batch)
+        ge += (batch >= obs).sum(axis=0)
+        if h and (ge[cols] >= h).all():
+            break
+    if ex is not None:
+        ex.shutdown(cancel_futures=True)
+    perm = np.concatenate(perm)
+
+    rows = []
+    print(f"  {'test':>12} {'Obs':>8} {'Exp':>8} {'Ratio':>7} {'p':>7} {'perms':>6}")
+    for name, c in zip([f"Jacquez k={k}" for k in ks] + ["Mantel r"], cols):
+        o, pc  = obs[c], perm[:, c]
+        stop   = np.flatnonzero(np.cumsum(pc >= o) >= h)[:1] if h else []
+        if len(stop):
+            pc    = pc[:stop[0] + 1]
+            p_val = (h + 1) / (len(pc) + 1)
+        else:
+            p_val = (np.sum(pc >= o) + 1) / (permutations + 1)
+        exp    = pc.mean()
+        ratio  = o / exp if c < k_max and exp > 0 else np.nan
         sig = "**" if p_val < 0.01 else ("*" if p_val < 0.05 else "n.s.")
-        print(f"  {d_km:>6} {t_h:>5} {obs:>8} {exp:>8.1f} {ratio:>7.3f} "
-              f"{p_val:>7.4f} {sig}")
+        print(f"  {name:>12} {o:>8.4g} {exp:>8.4g} {ratio:>7.3f} "
+              f"{p_val:>7.4f} {len(pc):>6} {sig}")
+        rows.append({"test": name, "obs": o, "exp": exp, "ratio": ratio,
+                     "p": p_val, "n_perm": len(pc)})
+    return pd.DataFrame(rows)
+
+
+# ── 4. Space-Time Scan ────────────────────────────────────────────────────────
+# Kulldorff space-time permutation scan: cylinders are circles of grid cells
+# around each occupied cell × OnsetHours windows; expected counts come from
+# the space and time margins, and replicates permute onset times.
+SCAN_CELL_KM    = 10.0    # grid cell size; every occupied cell is a centre
+SCAN_MAX_KM     = 100.0   # largest cylinder radius
+SCAN_MAX_CELLS  = 30      # at most this many nearest cells per cylinder
+SCAN_PERIOD_H   = (-24, 48)  # study period in OnsetHours; events outside are left out
+SCAN_BIN_H      = 1.0     # OnsetHours bin width
+SCAN_MAX_WINDOW = 12      # longest time window, in bins
+SCAN_REPLICATES = 999
+SCAN_TOP        = 5       # spatially non-overlapping clusters reported
+SCAN_KEEP       = 2000    # best cylinders kept per window length
+SCAN_WORKERS    = None    # process pool size (None = all cores, 1 = in-process)
+SCAN_BATCH      = 50      # replicates per task; fixes the per-task seed streams
+
+_SCAN = {}                # grid index shared with pool workers
+
+
+def scan_grid(coords: np.ndarray, t: np.ndarray):
+    """
+    Grid index for the scan. Returns each event's cell and time bin, the
+    cell centroids, and for every cell its nearest cells by great-circle
+    distance (within SCAN_MAX_KM, at most SCAN_MAX_CELLS) with their
+    distance in km. Missing neighbours point at an extra empty cell.
+    """
+    deg  = SCAN_CELL_KM / (EARTH_RADIUS_KM * np.pi / 180)
+    coslat = np.cos(np.radians(coords[:, 1].mean()))
+    grid = np.floor(coords * [coslat, 1] / deg)
+    _, cell = np.unique(grid, axis=0, return_inverse=True)
+    cell    = cell.ravel()
+    n_cells = cell.max() + 1
+    centre  = np.column_stack([np.bincount(cell, coords[:, k]) for k in (0, 1)])
+    centre /= np.bincount(cell)[:, None]
+
+    k     = np.arange(1, min(SCAN_MAX_CELLS, n_cells) + 1)
+    chord = 2 * np.sin(SCAN_MAX_KM / EARTH_RADIUS_KM / 2)
+    xyz   = _unit_xyz(centre)
+    d, nb = cKDTree(xyz).query(xyz, k=k, distance_upper_bound=chord)
+    km    = np.where(np.isinf(d), np.nan,
+                     2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(d, 2) / 2))
+    km    = pd.DataFrame(km).ffill(axis=1).values     # empty slots keep the radius
+
+    tbin = np.floor((t - t.min()) / SCAN_BIN_H).astype(np.int64)
+    return cell, tbin, centre, nb, km
+
+
+def scan_cylinders(cell, tbin, nb, n_cells: int, keep: int = 0, floor: float = 0.0):
+    """
+    Log-likelihood ratio of every cylinder (centre, radius step, window).
+    Per-cell counts by time bin are summed over each circle's cells
+    (cumulative over radius) and over time (prefix sums), so each
+    cylinder's count is one subtraction. Returns the maximum LLR and,
+    with keep > 0, the best `keep` cylinders per window length as rows of
+    (centre, radius step, first bin, n bins, observed, expected, LLR).
+
+    With floor > 0 only cylinders that can reach LLR >= floor are scored
+    (LLR <= c·log(c/μ) <= c·(c/μ − 1)); a maximum below floor is then
+    reported as 0. Replicates only need to be compared with the clusters
+    found, so this skips almost every cylinder.
+    """
+    N, T = len(cell), tbin.max() + 1
+    C = np.bincount(cell * T + tbin, minlength=(n_cells + 1) * T).reshape(-1, T)
+    P = np.zeros(nb.shape + (T + 1,), dtype=np.float32)     # exact below 2**24
+    P[..., 1:] = C[nb].cumsum(axis=1).cumsum(axis=2)
+    n_z = P[..., -1:]
+    D   = np.concatenate([[0], np.bincount(tbin, minlength=T).cumsum()])
+    lo  = np.float32(floor * (1 - 1e-3))                    # float32 slack
+
+    best, rows = 0.0, []
+    for L in range(1, min(SCAN_MAX_WINDOW, T) + 1):
+        d_L = (D[L:] - D[:-L]) / N
+        c   = P[..., L:] - P[..., :-L]
+        mu  = n_z * d_L.astype(np.float32)
+        z, r, a = np.nonzero(c * (c - mu) > mu * lo)         # c > μ when floor = 0
+        if not len(z):
+            continue
+        ch = c[z, r, a].astype(float)
+        mh = n_z[z, r, 0].astype(float) * d_L[a]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lh = xlogy(ch, ch / mh) + xlogy(N - ch, (N - ch) / (N - mh))
+        best = max(best, lh.max())
+        if keep:
+            top = np.argpartition(lh, -min(keep, len(lh)))[-keep:]
+            rows.append(np.column_stack([z[top], r[top], a[top], np.full(len(top), L),
+                                         ch[top], mh[top], lh[top]]))
+    if not keep:
+        return best
+    return best, (np.concatenate(rows) if rows else np.empty((0, 7)))
+
+
+def _scan_init(cell, tbin, nb, n_cells, floor):
+    _SCAN.update(cell=cell, tbin=tbin, nb=nb, n_cells=n_cells, floor=floor)
+
+
+def _scan_batch(seed, n_rep: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    k   = _SCAN
+    return np.array([scan_cylinders(k["cell"], rng.permutation(k["tbin"]), k["nb"],
+                                    k["n_cells"], floor=k["floor"])
+                     for _ in range(n_rep)])
+
+
+def run_scan(df: pd.DataFrame, coords: np.ndarray, replicates: int = SCAN_REPLICATES,
+             workers=SCAN_WORKERS) -> pd.DataFrame:
+    """
+    Where and when do incidents cluster in space-time? Reports the
+    SCAN_TOP most likely spatially non-overlapping cylinders, with
+    Monte Carlo p-values against the maximum LLR of each replicate.
+    Replicates run in batches of SCAN_BATCH on a process pool, seeded
+    from SeedSequence(SEED).spawn() as in run_knox.
+    """
+    print("\n── Space-Time Scan (Kulldorff, space-time permutation) ───────────")
+
+    t    = df["OnsetHours"].values.astype(float)
+    keep = (t >= SCAN_PERIOD_H[0]) & (t <= SCAN_PERIOD_H[1])
+    t, coords = t[keep], coords[keep]
+    cell, tbin, centre, nb, km = scan_grid(coords, t)
+    n_cells = len(centre)
+    print(f"  Events: {len(t):,} ({(~keep).sum()} outside {SCAN_PERIOD_H} h)  "
+          f"centres: {n_cells:,}  radius steps: {nb.shape[1]}  "
+          f"time bins: {tbin.max() + 1}")
+
+    _, cand = scan_cylinders(cell, tbin, nb, n_cells, keep=SCAN_KEEP)
+    rows, used = [], set()
+    for z, r, a, L, c, mu, llr in cand[np.argsort(-cand[:, 6], kind="stable")]:
+        z, r, a, L = int(z), int(r), int(a), int(L)
+        cells = set(nb[z, :r + 1]) - {n_cells}
+        if cells & used:
+            continue
+        used |= cells
+        rows.append({
+            "Longitude": centre[z, 0], "Latitude": centre[z, 1],
+            "radius_km": km[z, r], "n_cells": len(cells),
+            "t_start":   t.min() + a * SCAN_BIN_H,
+            "t_end":     t.min() + (a + L) * SCAN_BIN_H,
+            "obs": c, "exp": mu, "rr": c / mu, "llr": llr,
+        })
+        if len(rows) == SCAN_TOP:
+            break
+    out = pd.DataFrame(rows, columns=["Longitude", "Latitude", "radius_km", "n_cells",
+                                      "t_start", "t_end", "obs", "exp", "rr", "llr"])
+
+    # Replicates only need to be ranked against the reported clusters
+    floor = out["llr"].min() if len(out) else np.inf
+    sizes = [min(SCAN_BATCH, replicates - s) for s in range(0, replicates, SCAN_BATCH)]
+    seeds = np.random.SeedSequence(SEED).spawn(len(sizes))
+    args  = (cell, tbin, nb, n_cells, floor)
+    if workers == 1:
+        _scan_init(*args)
+        sims = list(map(_scan_batch, seeds, sizes))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_scan_init,
+                                 initargs=args) as ex:
+            sims = list(ex.map(_scan_batch, seeds, sizes))
+    sims = np.concatenate(sims)
+    out["p"] = [(np.sum(sims >= llr) + 1) / (replicates + 1) for llr in out["llr"]]
+
+    print(f"  {'Lat':>7} {'Lon':>8} {'r_km':>6} {'t_h':>11} {'Obs':>5} "
+          f"{'Exp':>6} {'RR':>5} {'LLR':>7} {'p':>7}")
+    for _, row in out.iterrows():
+        sig = "**" if row.p < 0.01 else ("*" if row.p < 0.05 else "n.s.")
+        print(f"  {row.Latitude:>7.2f} {row.Longitude:>8.2f} {row.radius_km:>6.1f} "
+              f"{row.t_start:>5.1f}–{row.t_end:<5.1f} {row.obs:>5.0f} {row.exp:>6.1f} "
+              f"{row.rr:>5.2f} {row.llr:>7.2f} {row.p:>7.4f} {sig}")
+    return out
+
+
+# ── 5. Sliding-Window LISA ────────────────────────────────────────────────────
+# A WINDOW_H-hour window steps over OnsetHours. KNN-k neighbour lists and
+# spatial lags are updated only for events whose neighbourhood changed, so
+# a step costs little more than the events entering and leaving it.
+WINDOW_H            = 6.0
+WINDOW_STEP_H       = 1.0      # e.g. 0.25 to refresh every 15 minutes
+WINDOW_PERIOD_H     = SCAN_PERIOD_H
+WINDOW_K            = 8
+WINDOW_MIN_EVENTS   = 30
+WINDOW_VARIABLE     = "Severity"
+WINDOW_PERMUTATIONS = PERMUTATIONS
+WINDOW_CHECK        = False    # compare every window's KNN with a brute-force query
+WINDOW_F            = ROOT / "data" / "lisa_windows.csv"
+
+
+class SlidingKNN:
+    """
+    KNN-k neighbour lists over a changing set of active events. `step`
+    drops leaving events and adds entering ones, then re-queries only
+    events that lost a neighbour (plus the new ones) and merges entering
+    events into lists they now belong to. Row-standardised spatial lags
+    of `y` are kept in step with the lists.
+    """
+
+    def __init__(self, coords: np.ndarray, y: np.ndarray, k: int = WINDOW_K):
+        n = len(coords)
+        self.coords, self.y, self.k = coords, y.astype(float), k
+        self.active = np.zeros(n, dtype=bool)
+        self.nbr    = np.full((n, k), -1)
+        self.dist   = np.full((n, k), np.inf)
+        self.lag    = np.zeros(n)
+
+    def step(self, enter: np.ndarray, leave: np.ndarray) -> int:
+        """Update for entering / leaving event indices; returns rows changed."""
+        k = self.k
+        self.active[leave] = False
+        self.nbr[leave], self.dist[leave] = -1, np.inf
+        if len(leave):                                   # lost a neighbour: stale
+            act  = np.flatnonzero(self.active)
+            lost = act[np.isin(self.nbr[act], leave).any(axis=1)]
+            self.nbr[lost], self.dist[lost] = -1, np.inf
+        self.active[enter] = True
+        act = np.flatnonzero(self.active)
+        if len(act) <= k:
+            return 0
+
+        redo  = act[(self.nbr[act] < 0).any(axis=1)]     # new, lost, or set while too few
+        tree  = cKDTree(self.coords[act])
+        d, j  = tree.query(self.coords[redo], k=k + 1)
+        j     = act[j]
+        own   = j == redo[:, None]
+        own[~own.any(axis=1), -1] = True                 # self hidden by ties
+        self.nbr[redo]  = j[~own].reshape(-1, k)
+        self.dist[redo] = d[~own].reshape(-1, k)
+
+        rest = np.setdiff1d(act, redo)
+        grow = rest[:0]
+        if len(enter) and len(rest):
+            ke   = min(k, len(enter))
+            kd   = self.dist[rest, -1]
+            d, j = cKDTree(self.coords[enter]).query(
+                self.coords[rest], k=np.arange(1, ke + 1), distance_upper_bound=kd.max())
+            d[d >= kd[:, None]] = np.inf
+            hit  = np.isfinite(d).any(axis=1)
+            grow = rest[hit]
+            if len(grow):
+                dd = np.hstack([self.dist[grow], d[hit]])
+                jj = np.hstack([self.nbr[grow], enter[np.minimum(j[hit], len(enter) - 1)]])
+                o  = np.argsort(dd, axis=1, kind="stable")[:, :k]
+                self.dist[grow] = np.take_along_axis(dd, o, axis=1)
+                self.nbr[grow]  = np.take_along_axis(jj, o, axis=1)
+
+        changed = np.concatenate([redo, grow])
+        self.lag[changed] = self.y[self.nbr[changed]].mean(axis=1)
+        return len(changed)
+
+    def mismatches(self) -> int:
+        """Active rows whose neighbour distances differ from a brute-force KNN."""
+        act = np.flatnonzero(self.active)
+        if len(act) <= self.k:
+            return 0
+        d, _ = cKDTree(self.coords[act]).query(self.coords[act], k=self.k + 1)
+        bad  = ~np.isclose(self.dist[act], d[:, 1:]).all(axis=1)
+        bad |= ~self.active[self.nbr[act]].all(axis=1)
+        return int(bad.sum())
+
+
+def run_lisa_windows(df: pd.DataFrame, coords: np.ndarray,
+                     permutations: int = WINDOW_PERMUTATIONS) -> pd.DataFrame:
+    """
+    LISA for WINDOW_VARIABLE in each window, with KNN-k weights among the
+    window's events. Local I uses the incrementally kept lags; pseudo
+    p-values come from the conditional randomisation of
+    `permutation_inference` (sequential when SEQUENTIAL_ALPHA is set).
+    Writes one row per window with Moran's I, cluster counts and the
+    centroid of the HH (hotspot) events to WINDOW_F.
+    """
+    print("\n── Sliding-Window LISA ───────────────────────────────────────────")
+
+    t     = df["OnsetHours"].values.astype(float)
+    order = np.argsort(t, kind="stable")
+    t, xy = t[order], coords[order]
+    y     = df[WINDOW_VARIABLE].values[order].astype(float)
+    knn   = SlidingKNN(xy, y)
+    k     = knn.k
+    h     = sequential_h(SEQUENTIAL_ALPHA, permutations) if SEQUENTIAL_ALPHA else None
+
+    rows, lo, hi = [], 0, 0
+    for t0 in np.arange(WINDOW_PERIOD_H[0], WINDOW_PERIOD_H[1] - WINDOW_H + 1e-9,
+                        WINDOW_STEP_H):
+        new_lo = np.searchsorted(t, t0, side="left")
+        new_hi = np.searchsorted(t, t0 + WINDOW_H, side="left")
+        leave  = np.arange(lo, min(new_lo, hi))
+        enter  = np.arange(max(hi, new_lo), new_hi)
+        changed = knn.step(enter, leave)
+        lo, hi  = new_lo, new_hi
+        if WINDOW_CHECK and knn.mismatches():
+            raise RuntimeError(f"window {t0:g} h: {knn.mismatches()} stale KNN rows")
+
+        n, yw = hi - lo, y[lo:hi]
+        if n < WINDOW_MIN_EVENTS or yw.std() == 0:
+            continue
+        m, sd = yw.mean(), yw.std()
+        z, zl = (yw - m) / sd, (knn.lag[lo:hi] - m) / sd
+        Is    = (n - 1) * z * zl / (z * z).sum()
+
+        ids    = vec_permutations(k, n, permutations, SEED)
+        args   = (0, n, z, np.arange(0, n * k + 1, k), np.full(n * k, 1.0 / k),
+                  np.zeros(n), ids, (n - 1) / (z * z).sum(), Is)
+        p_sim  = (_lisa_chunk_seq(*args, h) if h else _lisa_chunk(*args))[0]
 
+        sig = p_sim < 0.05
+        q   = np.select([(z > 0) & (zl > 0), (z <= 0) & (zl > 0), (z <= 0) & (zl <= 0)],
+                        [1, 2, 3], 4)
+        hh  = sig & (q == 1)
+        rows.append({
+            "t_start": t0, "t_end": t0 + WINDOW_H, "n": n, "updated": changed,
+            "moran_I": (z * zl).sum() / (z * z).sum(),
+            "HH": hh.sum(), "LL": (sig & (q == 3)).sum(),
+            "LH": (sig & (q == 2)).sum(), "HL": (sig & (q == 4)).sum(),
+            "HH_lat": xy[lo:hi][hh, 1].mean() if hh.any() else np.nan,
+            "HH_lon": xy[lo:hi][hh, 0].mean() if hh.any() else np.nan,
+        })
+    out = pd.DataFrame(rows)
+    out.to_csv(WINDOW_F, index=False)
 
-# ── 4. Highway Diffusion ──────────────────────────────────────────────────────
-def run_highway_diffusion(df: pd.DataFrame):
+    print(f"  {WINDOW_VARIABLE}, {WINDOW_H:g} h window every {WINDOW_STEP_H:g} h, "
+          f"KNN-{k}: {len(out)} windows")
+    print(f"  {'t_h':>13} {'n':>5} {'upd':>5} {'I':>7} {'HH':>4} {'LL':>4} "
+          f"{'HH centroid':>16}")
+    for _, r in out.iterrows():
+        print(f"  {r.t_start:>6.1f}–{r.t_end:<6.1f} {r.n:>5.0f} {r.updated:>5.0f} "
+              f"{r.moran_I:>7.3f} {r.HH:>4.0f} {r.LL:>4.0f} "
+              f"{r.HH_lat:>7.2f},{r.HH_lon:>8.2f}")
+    print(f"  → Saved: {WINDOW_F}")
+    return out
+
+
+# ── 6. Highway Diffusion ──────────────────────────────────────────────────────
+# Corridors as node sequences of the 03 highway graph (build_graph); each is
+# drawn as a polyline through the node coordinates. Incidents within
+# CORRIDOR_BUFFER_KM of a polyline belong to it, and their position is the
+# linear distance from the first node along the route.
+CORRIDORS = {
+    "GDL→Tepic→Mazatlán (Hwy 15D)":  ["GDL", "TPC", "MZT"],
+    "CDMX→Monterrey (Hwy 57D/85D)":  ["CDMX", "QRO", "SLP", "SAL", "MTY"],
+    "GDL→Morelia (Hwy 15)":          ["GDL", "PAT", "MOR"],
+    "CDMX→Puebla (Hwy 150D)":        ["CDMX", "PUE"],
+    "GDL→Manzanillo (Hwy 54D)":      ["GDL", "GUR", "COL", "MAN"],
+}
+CORRIDOR_BUFFER_KM = 15.0
+CORRIDOR_LAT0      = 21.0   # reference latitude of the equirectangular km plane
+NETWORK_SCRIPT     = Path(__file__).resolve().with_name("03_network_analysis.py")
+
+
+def road_nodes() -> dict:
+    """{node_id: (name, lat, lon)} from build_graph in 03_network_analysis.py."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("network_analysis", NETWORK_SCRIPT)
+    mod  = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    _, nodes = mod.build_graph()
+    return nodes
+
+
+def plane_km(lon, lat) -> np.ndarray:
+    """Equirectangular projection to km, scaled at CORRIDOR_LAT0."""
+    k = np.radians(EARTH_RADIUS_KM)
+    return np.column_stack([np.asarray(lon) * k * np.cos(np.radians(CORRIDOR_LAT0)),
+                            np.asarray(lat) * k])
+
+
+def corridor_positions(coords: np.ndarray, corridors: dict, nodes: dict) -> pd.DataFrame:
+    """
+    Assign incidents to corridors and project them onto each route.
+
+    All corridor buffers go into one STRtree and all incidents are queried
+    against it at once; the (incident, corridor) hits are then projected
+    with a single vectorised line_locate_point. An incident near several
+    corridors appears once per corridor. Returns row, corridor, pos_km.
+    """
+    seqs  = list(corridors.values())
+    ids   = [n for seq in seqs for n in seq]
+    lines = shapely.linestrings(
+        plane_km([nodes[n][2] for n in ids], [nodes[n][1] for n in ids]),
+        indices=np.repeat(np.arange(len(seqs)), [len(seq) for seq in seqs]))
+    tree  = shapely.STRtree(shapely.buffer(lines, CORRIDOR_BUFFER_KM))
+    pts   = shapely.points(plane_km(coords[:, 0], coords[:, 1]))
+
+    row, c = tree.query(pts, predicate="intersects")
+    names  = np.array(list(corridors), dtype=object)
+    return pd.DataFrame({
+        "row":      row,
+        "corridor": names[c],
+        "pos_km":   shapely.line_locate_point(lines[c], pts[row]),
+    })
+
+
+def run_highway_diffusion(df: pd.DataFrame, coords: np.ndarray,
+                          corridors: dict = CORRIDORS):
     """
-    For each highway corridor, extract incidents along it (within ~15km buffer),
-    sort by approximate highway position, and compute Spearman ρ between
-    position and onset time. Positive ρ = northward/eastward diffusion.
+    For each highway corridor, take incidents within CORRIDOR_BUFFER_KM of
+    its polyline and compute Spearman ρ between route position (km from the
+    first node) and onset time. Positive ρ = diffusion away from the origin.
     """
     print("\n── Highway Diffusion (Spearman ρ, position vs. onset time) ──────")
 
-    corridors = {
-        "GDL→Tepic→Mazatlán (Hwy 15D)": {
-            "bounds": (-107.5, 19.5, -103.2, 23.5),
-            "sort_by": "Latitude",   # northward
-        },
-        "CDMX→Monterrey (Hwy 57D/85D)": {
-            "bounds": (-101.5, 19.0, -98.5, 26.5),
-            "sort_by": "Latitude",
-        },
-        "GDL→Morelia (Hwy 15)": {
-            "bounds": (-103.5, 19.4, -100.9, 21.0),
-            "sort_by": "Longitude",  # eastward
-        },
-        "CDMX→Puebla (Hwy 150D)": {
-            "bounds": (-99.5, 18.8, -96.8, 19.7),
-            "sort_by": "Longitude",
-        },
-        "GDL→Manzanillo (Hwy 54D)": {
-            "bounds": (-104.5, 18.9, -103.0, 21.0),
-            "sort_by": "Latitude",
-        },
-    }
-
-    for name, cfg in corridors.items():
-        x0, y0, x1, y1 = cfg["bounds"]
-        subset = df[
-            df["Longitude"].between(x0, x1) &
-            df["Latitude"].between(y0, y1)
-        ].copy()
+    hits  = corridor_positions(coords, corridors, road_nodes())
+    hits["OnsetHours"] = df["OnsetHours"].values[hits["row"]]
+    by    = dict(tuple(hits.groupby("corridor", sort=False)))
 
+    for name in corridors:
+        subset = by.get(name, hits[:0])
         if len(subset) < 5:
             print(f"  {name}: n={len(subset)} (too few, skip)")
             continue
 
-        rho, p = spearmanr(subset[cfg["sort_by"]], subset["OnsetHours"])
+        rho, p = spearmanr(subset["pos_km"], subset["OnsetHours"])
         sig = "**" if p < 0.01 else ("*" if p < 0.05 else "n.s.")
         print(f"  {name}")
         print(f"    n={len(subset):3d}  ρ={rho:+.3f}  p={p:.4f} {sig}")
 
 
-# ── 5. Moran Scatterplot ──────────────────────────────────────────────────────
-def plot_moran_scatter(df: pd.DataFrame, coords: np.ndarray):
-    W = libpysal.weights.KNN.from_array(coords, k=8)
-    W.transform = "r"
+# ── 7. Moran Scatterplot ──────────────────────────────────────────────────────
+def plot_moran_scatter(df: pd.DataFrame, coords: np.ndarray, results: dict):
+    W = get_weights(coords, "KNN-8")
 
     fig, axes = plt.subplots(1, 2, figsize=(14, 6), facecolor="white")
     for ax, (var_name, y) in zip(axes, [("Severity", df["Severity"].values),
                                          ("OnsetHours", df["OnsetHours"].values)]):
-        mi = Moran(y, W, permutations=PERMUTATIONS, seed=SEED)
+        mi = results[("KNN-8", var_name)]
 
         y_std = (y - y.mean()) / y.std()
         wy    = W.sparse.dot(y_std)
@@ -270,16 +1191,229 @@ def plot_moran_scatter(df: pd.DataFrame, coords: np.ndarray):
     print(f"  → Saved: {FIG_DIR / 'fig2_moran.png'}")
 
 
+# ── 8. Spatial Lag Regression ─────────────────────────────────────────────────
+# SAR lag model y = ρWy + Xβ + ε, fitted by concentrated maximum likelihood.
+# ln|I − ρW| comes from cached eigenvalues of W up to SAR_EIG_MAX events and
+# from a Chebyshev approximation with stochastic traces above that, so the
+# fit never forms or inverts a dense n × n matrix on large inputs.
+SAR_WEIGHTS    = "KNN-8"
+SAR_COVARIATES = ["Source", "SubtypeNorm"]   # categorical, one dummy per level
+SAR_MIN_LEVEL  = 5        # rarer levels are pooled into "(pooled)"
+SAR_EIG_MAX    = 4000     # exact eigenvalues up to this n, Chebyshev above
+SAR_CHEB_ORDER = 20       # Chebyshev polynomial order
+SAR_PROBES     = 50       # Rademacher probes for the Chebyshev traces
+SAR_RHO_BOUNDS = (-0.99, 0.99)
+
+_LOGDET = {}              # (coords, weights) key → ln|I − ρW| callable
+
+
+def chebyshev_traces(Ws: sparse.csr_matrix, order: int, probes: int, seed: int) -> np.ndarray:
+    """
+    tr T_j(W) for j = 0..order. j <= 2 are exact; higher terms use the
+    Hutchinson estimator uᵀT_j(W)u over Rademacher probes, advanced with
+    the three-term recurrence T_{j+1} = 2W·T_j − T_{j−1} (sparse mat-vecs).
+    """
+    n   = Ws.shape[0]
+    tr  = np.zeros(order + 1)
+    tr[0] = n
+    tr[1] = Ws.diagonal().sum()
+    tr[2] = 2 * Ws.multiply(Ws.T).sum() - n
+    U     = np.random.default_rng(seed).choice([-1.0, 1.0], size=(n, probes))
+    prev, cur = U, Ws @ U
+    for j in range(2, order + 1):
+        prev, cur = cur, 2 * (Ws @ cur) - prev
+        if j > 2:
+            tr[j] = (U * cur).sum() / probes
+    return tr
+
+
+def logdet_fn(coords: np.ndarray, name: str):
+    """
+    ln|I − ρW| as a function of ρ for the row-standardised weights `name`,
+    built once per coordinate set. Row-standardised W has spectral radius
+    1, so its spectrum lies in the Chebyshev interval [-1, 1].
+    """
+    key = (weights_key(coords, WEIGHT_SPECS[name]), name)
+    if key not in _LOGDET:
+        Ws = get_weights(coords, name).sparse.tocsr()
+        n  = Ws.shape[0]
+        if n <= SAR_EIG_MAX:
+            lam = np.linalg.eigvals(Ws.toarray())
+            _LOGDET[key] = lambda rho: np.log(1 - rho * lam).sum().real
+        else:
+            q  = SAR_CHEB_ORDER
+            tr = chebyshev_traces(Ws, q, SAR_PROBES, SEED)
+            th = np.pi * (np.arange(q + 1) + 0.5) / (q + 1)
+            Tj = np.cos(np.outer(np.arange(q + 1), th))          # T_j(x_k)
+
+            def cheb(rho):
+                c = 2 / (q + 1) * Tj @ np.log(1 - rho * np.cos(th))
+                return c @ tr - c[0] * n / 2
+            _LOGDET[key] = cheb
+    return _LOGDET[key]
+
+
+def sar_design(df: pd.DataFrame, covariates=SAR_COVARIATES) -> pd.DataFrame:
+    """Intercept plus treatment dummies; the most frequent level is the base."""
+    cols = {"const": np.ones(len(df))}
+    for c in covariates:
+        x   = df[c].astype(object).fillna("missing").astype(str)
+        cnt = x.value_counts()
+        x   = x.where(x.map(cnt) >= SAR_MIN_LEVEL, "(pooled)")
+        for level in x.value_counts().index[1:]:
+            cols[f"{c}={level}"] = (x == level).values.astype(float)
+    return pd.DataFrame(cols, index=df.index)
+
+
+def sar_fit(y: np.ndarray, X: np.ndarray, Ws: sparse.csr_matrix, logdet) -> dict:
+    """
+    Concentrated ML for the SAR lag model. With e0, eL the OLS residuals of
+    y and Wy on X, σ²(ρ) = |e0 − ρ·eL|²/n is quadratic in ρ, so each
+    likelihood evaluation costs one log-determinant. SE(ρ) is from the
+    curvature of the profile likelihood; SE(β) is conditional on ρ̂.
+    """
+    n, wy   = len(y), Ws @ y
+    XtXi    = np.linalg.pinv(X.T @ X)
+    b0, bL  = XtXi @ X.T @ y, XtXi @ X.T @ wy
+    e0, eL  = y - X @ b0, wy - X @ bL
+    a, b, c = e0 @ e0, e0 @ eL, eL @ eL
+
+    def loglik(rho):
+        s2 = (a - 2 * rho * b + rho ** 2 * c) / n
+        return -n / 2 * (np.log(2 * np.pi * s2) + 1) + logdet(rho)
+
+    rho = minimize_scalar(lambda r: -loglik(r), bounds=SAR_RHO_BOUNDS,
+                          method="bounded", options={"xatol": 1e-8}).x
+    eps   = 1e-4
+    curv  = (loglik(rho + eps) - 2 * loglik(rho) + loglik(rho - eps)) / eps ** 2
+    beta  = b0 - rho * bL
+    s2    = (a - 2 * rho * b + rho ** 2 * c) / n
+    lr    = 2 * (loglik(rho) - loglik(0.0))
+    return {"rho": rho, "se_rho": np.sqrt(-1 / curv) if curv < 0 else np.nan,
+            "beta": beta, "se_beta": np.sqrt(s2 * np.diag(XtXi)), "sigma2": s2,
+            "loglik": loglik(rho), "lr": lr, "p_lr": chi2.sf(max(lr, 0.0), 1)}
+
+
+def run_spatial_lag(df: pd.DataFrame, coords: np.ndarray, name: str = SAR_WEIGHTS,
+                    covariates=SAR_COVARIATES) -> dict:
+    """Severity ~ ρ·W·Severity + covariates, SAR lag model by ML."""
+    print("\n── Spatial Lag Regression (SAR, ML) ──────────────────────────────")
+
+    X   = sar_design(df, covariates)
+    Ws  = get_weights(coords, name).sparse.tocsr()
+    fit = sar_fit(df["Severity"].values.astype(float), X.values, Ws,
+                  logdet_fn(coords, name))
+
+    how = "eigenvalues" if len(df) <= SAR_EIG_MAX else f"Chebyshev q={SAR_CHEB_ORDER}"
+    print(f"  Severity ~ ρ·W·Severity + {' + '.join(covariates)}  "
+          f"[{name}, n={len(df)}, log-det: {how}]")
+    sig = "**" if fit["p_lr"] < 0.01 else ("*" if fit["p_lr"] < 0.05 else "n.s.")
+    print(f"  ρ={fit['rho']:+.4f}  SE={fit['se_rho']:.4f}  "
+          f"LR={fit['lr']:.2f}  p={fit['p_lr']:.4f} {sig}  logL={fit['loglik']:.1f}")
+    for col, bt, se in zip(X.columns, fit["beta"], fit["se_beta"]):
+        z = bt / se if se > 0 else np.nan
+        print(f"    {col:<40} {bt:>+8.3f}  SE={se:.3f}  z={z:>+6.2f}")
+    fit["columns"] = list(X.columns)
+    return fit
+
+
+# ── 9. Kernel Density Hotspots ────────────────────────────────────────────────
+# Continuous hotspot surfaces on a fixed lon/lat grid over the 04 map extent.
+# Events are binned onto the grid and convolved with a Gaussian kernel by
+# FFT, so the cost depends on the grid size, not on the number of events.
+KDE_EXTENT       = (-120.0, -86.0, 13.5, 34.0)   # lon_min, lon_max, lat_min, lat_max
+KDE_CELL_DEG     = 0.05
+KDE_BANDWIDTH_KM = 25.0
+KDE_T_REF_H      = 24.0   # decay reference: 15:00 CST Feb 23; later events drop out
+# name → (weight column or None, half-life in hours or None)
+KDE_SURFACES = {
+    "count":          (None,       None),
+    "severity":       ("Severity", None),
+    "severity_decay": ("Severity", 6.0),
+}
+KDE_F = ROOT / "data" / "kde_surfaces.npz"
+
+
+def kde_grid(extent=KDE_EXTENT, cell: float = KDE_CELL_DEG):
+    """Cell edges and centres (lon, lat) of the hotspot grid."""
+    x0, x1, y0, y1 = extent
+    xe = np.linspace(x0, x1, int(round((x1 - x0) / cell)) + 1)
+    ye = np.linspace(y0, y1, int(round((y1 - y0) / cell)) + 1)
+    return xe, ye, (xe[:-1] + xe[1:]) / 2, (ye[:-1] + ye[1:]) / 2
+
+
+def kde_surface(coords: np.ndarray, weights, xe: np.ndarray, ye: np.ndarray,
+                bandwidth_km: float = KDE_BANDWIDTH_KM) -> np.ndarray:
+    """
+    Gaussian KDE on the grid as weighted events per km², shape (lat, lon).
+
+    Weighted counts are binned with histogram2d and convolved with the
+    kernel (truncated at 4σ) through scipy.signal.fftconvolve. σ is set
+    in degrees at the grid's middle latitude, then each row is divided by
+    its own cell area.
+    """
+    k     = np.radians(EARTH_RADIUS_KM)
+    lat0  = np.radians((ye[0] + ye[-1]) / 2)
+    dx    = (xe[1] - xe[0]) * k * np.cos(lat0)              # km per cell
+    dy    = (ye[1] - ye[0]) * k
+    hx    = np.arange(-int(np.ceil(4 * bandwidth_km / dx)), int(np.ceil(4 * bandwidth_km / dx)) + 1)
+    hy    = np.arange(-int(np.ceil(4 * bandwidth_km / dy)), int(np.ceil(4 * bandwidth_km / dy)) + 1)
+    ker   = np.exp(-0.5 * (((hy * dy)[:, None] / bandwidth_km) ** 2 +
+                           ((hx * dx)[None, :] / bandwidth_km) ** 2))
+    ker  /= ker.sum()
+
+    binned, _, _ = np.histogram2d(coords[:, 1], coords[:, 0], bins=[ye, xe],
+                                  weights=weights)
+    dens  = np.clip(fftconvolve(binned, ker, mode="same"), 0, None)
+    yc    = np.radians((ye[:-1] + ye[1:]) / 2)
+    area  = (xe[1] - xe[0]) * k * np.cos(yc) * dy
+    return dens / area[:, None]
+
+
+def run_kde_hotspots(df: pd.DataFrame, coords: np.ndarray, surfaces=KDE_SURFACES,
+                     bandwidth_km: float = KDE_BANDWIDTH_KM, t_ref: float = KDE_T_REF_H):
+    """
+    Write one KDE surface per entry of `surfaces` to KDE_F, together with
+    the grid (lon/lat edges and centres) so 04 can draw them with imshow or
+    pcolormesh. Time decay weights an event by 0.5 ** ((t_ref − t) / half_life).
+    """
+    print("\n── Kernel Density Hotspots (FFT) ─────────────────────────────────")
+
+    xe, ye, xc, yc = kde_grid()
+    t   = df["OnsetHours"].values.astype(float)
+    out = {"lon_edges": xe, "lat_edges": ye, "lon": xc, "lat": yc,
+           "bandwidth_km": bandwidth_km, "t_ref_h": t_ref}
+    print(f"  Grid {len(yc)} × {len(xc)} cells of {KDE_CELL_DEG:g}°, "
+          f"bandwidth {bandwidth_km:g} km")
+    for name, (col, half_life) in surfaces.items():
+        w = np.ones(len(df)) if col is None else df[col].values.astype(float)
+        if half_life is not None:
+            w = np.where(t <= t_ref, w * 0.5 ** ((t_ref - t) / half_life), 0.0)
+        z  = kde_surface(coords, w, xe, ye, bandwidth_km)
+        out[name] = z.astype(np.float32)
+        r, c = np.unravel_index(np.argmax(z), z.shape)
+        print(f"  {name:<16} peak {z[r, c]:.4f}/km² at {yc[r]:.2f}, {xc[c]:.2f}  "
+              f"(mass {w.sum():.1f})")
+    np.savez_compressed(KDE_F, **out)
+    print(f"  → Saved: {KDE_F}")
+    return out
+
+
 # ── Main ──────────────────────────────────────────────────────────────────────
 def main():
     df     = load_data()
     coords = df[["Longitude", "Latitude"]].values
 
-    run_moran(df)
+    moran  = run_moran(df, coords)
     df     = run_lisa(df, coords)
     run_knox(df, coords)
-    run_highway_diffusion(df)
-    plot_moran_scatter(df, coords)
+    run_knn_interaction(df, coords)
+    run_scan(df, coords)
+    run_lisa_windows(df, coords)
+    run_highway_diffusion(df, coords)
+    plot_moran_scatter(df, coords, moran)
+    run_spatial_lag(df, coords)
+    run_kde_hotspots(df, coords)
 
     print("\nDone.")
 
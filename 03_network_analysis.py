@@ -8,8 +8,8 @@ optimal blockade strategy.
 Analyses performed:
     1. Build Mexico federal highway graph (79 nodes, 114 edges)
     2. Betweenness centrality (node and edge, km-weighted)
-    3. Node removal impact — Δ total pairwise travel (km)
-    4. Greedy sequential optimal blockade (top-20 nodes)
+    3. Node and edge removal impact — Δ total pairwise travel (km)
+    4. Greedy sequential optimal blockade (top-20 nodes, top-20 edges)
     5. Match actual CJNG blockades to nearest network nodes
     6. Statistical comparison: actual vs. optimal
 
@@ -19,15 +19,18 @@ Outputs:
     data/betweenness.csv
     data/edge_betweenness.csv
     data/greedy_blockade.csv
+    data/greedy_edge_blockade.csv
     data/network_vs_blockades.csv
 
 Usage:
-    python code/03_network_analysis.py
+    python code/03_network_analysis.py [--steps N] [--lazy]
 
 Requirements:
-    pandas, numpy, scipy, networkx
+    pandas, pyarrow, numpy, scipy, networkx
 """
 
+import argparse
+import heapq
 import pickle
 import warnings
 warnings.filterwarnings("ignore")
@@ -35,13 +38,19 @@ warnings.filterwarnings("ignore")
 import numpy as np
 import pandas as pd
 import networkx as nx
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components, dijkstra
 from scipy.spatial.distance import cdist
 from scipy.stats import spearmanr
 
 # ── Paths ─────────────────────────────────────────────────────────────────────
 ROOT    = Path(__file__).resolve().parent.parent
-DATA_F  = ROOT / "data" / "mexico_incidents_COMBINED_feb22-23_2026.xlsx"
+DATA_F  = ROOT / "data" / "mexico_incidents_INCIDENTS_feb22-23_2026.parquet"
+# raw records instead of canonical incidents:
+#   ROOT / "data" / "mexico_incidents_COMBINED_feb22-23_2026.parquet"
+BLOCKADE = "Narco Blockade"   # SubtypeNorm label, see alert_lexicon.json
 OUT_DIR = ROOT / "data"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -153,16 +162,289 @@ def build_graph() -> tuple[nx.Graph, dict]:
     return G, nodes
 
 
+# ── Matrix APSP engine ────────────────────────────────────────────────────────
+# The graph is held once as a symmetric CSR matrix of km in G's node order.
+# A removal set is a boolean `keep` mask over those rows; totals come from
+# scipy.sparse.csgraph on the masked submatrix, with no graph copies.
+def graph_csr(G: nx.Graph) -> tuple[sparse.csr_matrix, list]:
+    """(CSR km adjacency, node order) for G."""
+    order = list(G.nodes())
+    A = nx.to_scipy_sparse_array(G, nodelist=order, weight="km", format="csr")
+    return sparse.csr_matrix(A, dtype=float), order
+
+
+def components(A: sparse.csr_matrix, keep: np.ndarray) -> np.ndarray:
+    """Component sizes of the subgraph on `keep`."""
+    _, labels = connected_components(A[keep][:, keep], directed=False)
+    return np.bincount(labels)
+
+
+def pairwise_total(A: sparse.csr_matrix, keep: np.ndarray, n_orig: int,
+                   penalty: float = 3000.0) -> float:
+    """
+    Sum of all-pairs shortest path km over the nodes in `keep`. If they are
+    not connected, each of the n_orig·(n_orig−1) ordered pairs that cannot
+    be reached (removed nodes included) adds `penalty`. Reachable ordered
+    pairs are read off the distance matrix: Σ s(s−1) over components is the
+    number of finite entries minus the diagonal.
+    """
+    D   = dijkstra(A[keep][:, keep], directed=True)   # A is symmetric
+    fin = np.isfinite(D)
+    if fin.all():
+        return float(D.sum())
+    unreachable = n_orig * (n_orig - 1) - (int(fin.sum()) - len(D))
+    return float(D[fin].sum()) + unreachable * penalty
+
+
+SP_BLOCK_ROWS = 256      # source rows per block of ShortestPaths._affected
+
+
+class ShortestPaths:
+    """
+    All-pairs shortest path km over the alive nodes of a CSR km matrix,
+    updated in place as nodes or edges are deleted.
+
+    Deleting c can only change d(s, t) when c lies on some shortest s–t
+    path, i.e. d(s, c) + d(c, t) = d(s, t) (c is in the shortest-path DAG,
+    the union of all predecessor trees, of s); for an edge (u, v, w) the
+    test is d(s, u) + w + d(v, t) = d(s, t) either way round. Only those
+    pairs are recomputed: each affected t is seeded with its best route
+    through an unaffected neighbour x, d(s, x) + w(x, t), and one Dijkstra
+    over a graph of all affected (s, t) pairs finishes them together.
+    `reach` / `total` score a hypothetical deletion; `remove` commits it.
+    """
+
+    def __init__(self, A: sparse.csr_matrix):
+        self.A     = A.copy()
+        self.A.sort_indices()
+        self.n     = A.shape[0]
+        row        = np.repeat(np.arange(self.n), np.diff(self.A.indptr))
+        self.key   = row * np.int64(self.n) + self.A.indices      # sorted (row, col)
+        self.twin  = np.searchsorted(self.key, self.A.indices * np.int64(self.n) + row)
+        self.alive = np.ones(self.n, dtype=bool)
+        self.D     = dijkstra(self.A, directed=True)
+        rows       = min(self.n, SP_BLOCK_ROWS)                 # scratch for _affected
+        self._buf  = np.empty((rows, self.n))
+        self._eq   = np.empty((rows, self.n), dtype=bool)
+        self._hit  = np.empty(self.D.shape, dtype=bool)
+        self.rowsum = np.zeros(self.n)
+        self.rowfin = np.zeros(self.n, dtype=np.int64)
+        self._sums(np.arange(self.n))
+
+    def _sums(self, rows: np.ndarray):
+        """Finite km and finite count of each row over alive columns."""
+        D   = np.where(self.alive, self.D[rows], np.inf)
+        fin = np.isfinite(D)
+        self.rowsum[rows] = np.where(fin, D, 0).sum(axis=1)
+        self.rowfin[rows] = fin.sum(axis=1)
+
+    def _cut(self, nodes, edges) -> np.ndarray:
+        """Positions in A.data of the edges that `nodes` / `edges` delete."""
+        ptr = self.A.indptr
+        pos = [np.arange(ptr[c], ptr[c + 1]) for c in nodes]
+        pos += [np.searchsorted(self.key, [u * np.int64(self.n) + v]) for u, v in edges]
+        pos = np.concatenate(pos) if pos else np.empty(0, dtype=np.int64)
+        return np.concatenate([pos, self.twin[pos]])
+
+    def _affected(self, nodes, edges, keep: np.ndarray):
+        """
+        (source, target) index arrays of alive pairs that may change,
+        tested SP_BLOCK_ROWS sources at a time.
+        """
+        D, hit = self.D, self._hit
+        via = [(c, 0.0, c) for c in nodes]           # d(s, a) + w + d(b, t)
+        for u, v in edges:
+            w = self.weight(u, v)
+            via += [(u, w, v), (v, w, u)]
+        for lo in range(0, self.n, len(self._buf)):
+            Db  = D[lo:lo + len(self._buf)]
+            buf = self._buf[:len(Db)]
+            eq  = self._eq[:len(Db)]
+            h   = hit[lo:lo + len(Db)]
+            h.fill(False)
+            for a, w, b in via:
+                np.add(Db[:, a, None] + w, D[None, b, :], out=buf)
+                h |= np.equal(buf, Db, out=eq)
+            h &= np.isfinite(Db, out=eq)
+        gone = np.flatnonzero(self.alive & ~keep)
+        hit[gone] = False
+        hit[:, gone] = False
+        return np.nonzero(hit)
+
+    def weight(self, u: int, v: int) -> float:
+        """km of edge (u, v); inf once it has been deleted."""
+        return self.A.data[np.searchsorted(self.key, u * np.int64(self.n) + v)]
+
+    def on_path(self, u: int, v: int) -> bool:
+        """
+        Whether edge (u, v) is a shortest u–v path. If it is not, it lies
+        on no shortest path at all and deleting it changes nothing.
+        """
+        w = self.weight(u, v)
+        return bool(np.isfinite(w) and w <= self.D[u, v])
+
+    def _solve(self, nodes, edges, commit: bool = False):
+        """Affected pairs and their new km; the cut is undone unless `commit`."""
+        keep = self.alive.copy()
+        keep[list(nodes)] = False
+        src, t = self._affected(nodes, edges, keep)
+        cut  = self._cut(nodes, edges)
+        was  = self.A.data[cut]
+        self.A.data[cut] = np.inf
+        m    = len(t)
+        new  = np.full(m, np.inf)
+        if m:
+            rows, si = np.unique(src, return_inverse=True)
+            pair = src * np.int64(self.n) + t            # sorted: np.nonzero order
+
+            # every edge (x → t) into an affected pair
+            ptr  = self.A.indptr
+            deg  = ptr[t + 1] - ptr[t]
+            rep  = np.repeat(np.arange(m), deg)
+            pos  = ptr[t][rep] + np.arange(len(rep)) - np.repeat(np.cumsum(deg) - deg, deg)
+            x, w = self.A.indices[pos], self.A.data[pos]
+            ok   = np.isfinite(w) & keep[x]
+            rep, x, w = rep[ok], x[ok], w[ok]
+            sx   = src[rep]
+            q    = sx * np.int64(self.n) + x
+            px   = np.minimum(np.searchsorted(pair, q), m - 1)
+            px   = np.where(pair[px] == q, px, -1)       # index of pair (sx, x), if affected
+
+            seed = np.full(m, np.inf)                # via an unaffected neighbour
+            out  = px < 0
+            r, val = rep[out], self.D[sx[out], x[out]] + w[out]    # r is sorted
+            if len(r):
+                first = np.flatnonzero(np.r_[True, r[1:] != r[:-1]])
+                seed[r[first]] = np.minimum.reduceat(val, first)
+            go   = np.isfinite(seed)
+            H = sparse.csr_matrix(
+                (np.concatenate([w[~out], seed[go]]),
+                 (np.concatenate([px[~out], m + si[go]]),
+                  np.concatenate([rep[~out], np.flatnonzero(go)]))),
+                shape=(m + len(rows), m + len(rows)))
+            new = dijkstra(H, directed=True, indices=m + np.arange(len(rows)),
+                           min_only=True)[:m]
+        if not commit:
+            self.A.data[cut] = was
+        return keep, src, t, new
+
+    def reach(self, nodes=(), edges=()) -> tuple[float, int, int]:
+        """
+        (Σ finite km, # reachable ordered pairs, # alive nodes) after
+        deleting `nodes` and `edges`.
+        """
+        keep, src, t, new = self._solve(nodes, edges)
+        gone = np.flatnonzero(self.alive & ~keep)
+        Dg   = self.D[np.ix_(keep, gone)]
+        fg   = np.isfinite(Dg)
+        fn   = np.isfinite(new)
+        km   = (self.rowsum[keep].sum() - Dg[fg].sum()
+                - self.D[src, t].sum() + new[fn].sum())
+        pair = int(self.rowfin[keep].sum()) - int(fg.sum()) - len(t) + int(fn.sum())
+        n    = int(keep.sum())
+        return float(km), pair - n, n
+
+    def reach_bridge(self, u: int, v: int) -> tuple[float, int, int]:
+        """
+        reach(edges=[(u, v)]) for a bridge, without a Dijkstra. Its two
+        sides a and b are the nodes nearer u and nearer v; every a–b path
+        uses the bridge, so d(s, t) = d(s, u) + w + d(v, t) and the km lost
+        sums from single rows of D.
+        """
+        D, w = self.D, self.weight(u, v)
+        a = D[u] < D[v]                               # both inf off u's component
+        b = D[v] < D[u]
+        na, nb = int(a.sum()), int(b.sum())
+        cross = nb * D[u, a].sum() + na * nb * w + na * D[v, b].sum()
+        n    = int(self.alive.sum())
+        km   = self.rowsum[self.alive].sum() - 2 * cross
+        pair = int(self.rowfin[self.alive].sum()) - 2 * na * nb
+        return float(km), pair - n, n
+
+    def total(self, n_orig: int, penalty: float = 3000.0, nodes=(), edges=()) -> float:
+        """pairwise_total after deleting `nodes` and `edges`."""
+        return penalised(*self.reach(nodes, edges), n_orig, penalty)
+
+    def remove(self, nodes=(), edges=()):
+        """Delete `nodes` and `edges` and repair the affected distances."""
+        keep, src, t, new = self._solve(nodes, edges, commit=True)
+        self.alive = keep
+        self.D[src, t] = new
+        gone = list(nodes)
+        self.D[:, gone] = np.inf
+        self.D[gone, :] = np.inf
+        self._sums(np.flatnonzero(keep) if gone else np.unique(src))
+
+
+def penalised(km: float, pairs: int, n: int, n_orig: int,
+              penalty: float = 3000.0) -> float:
+    """pairwise_total from ShortestPaths.reach output."""
+    if pairs == n * (n - 1):
+        return km
+    return km + (n_orig * (n_orig - 1) - pairs) * penalty
+
+
+# ── Parallel candidate evaluation ─────────────────────────────────────────────
+# Each worker receives the CSR arrays once and keeps its own ShortestPaths.
+# A task is (removed so far, candidate chunk): the worker replays any
+# removals it has not applied yet, then scores every candidate. Removals and
+# candidates are node indices or (u, v) edge index pairs. Chunks are
+# fixed-size and results come back in submission order, so scores and the
+# greedy choice do not depend on the number of workers.
+NETWORK_WORKERS = None    # process pool size (None = all cores, 1 = in-process)
+NETWORK_CHUNK   = 8       # candidates per task
+
+_NET = {}                 # CSR graph and ShortestPaths state of a worker
+
+
+def _net_init(data, indices, indptr, n):
+    _NET.clear()
+    _NET["A"] = sparse.csr_matrix((data, indices, indptr), shape=(n, n))
+
+
+def _item(c):
+    """Node index or edge index pair `c` as plain ints (picklable, hashable)."""
+    return tuple(map(int, c)) if isinstance(c, tuple) else int(c)
+
+
+def _deletion(c) -> dict:
+    """ShortestPaths keyword arguments deleting node or edge `c`."""
+    return {"edges": [c]} if isinstance(c, tuple) else {"nodes": [c]}
+
+
+def _net_reach(removed: tuple, cands) -> list:
+    """[(candidate, km, reachable pairs, alive nodes)] with `removed` applied."""
+    done = _NET.get("done", ())
+    if "sp" not in _NET or done != removed[:len(done)]:
+        _NET["sp"], done = ShortestPaths(_NET["A"]), ()
+    for r in removed[len(done):]:
+        _NET["sp"].remove(**_deletion(r))
+    _NET["done"] = removed
+    return [(c, *_NET["sp"].reach(**_deletion(c))) for c in cands]
+
+
+def candidate_pool(A: sparse.csr_matrix, workers=NETWORK_WORKERS):
+    """Process pool primed with A, or None for in-process evaluation."""
+    if workers == 1:
+        _net_init(A.data, A.indices, A.indptr, A.shape[0])
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=_net_init,
+                               initargs=(A.data, A.indices, A.indptr, A.shape[0]))
+
+
+def reach_candidates(ex, removed, cands) -> list:
+    """_net_reach over `cands` in NETWORK_CHUNK tasks, results in order."""
+    cands  = [_item(c) for c in cands]
+    chunks = [cands[i:i + NETWORK_CHUNK] for i in range(0, len(cands), NETWORK_CHUNK)]
+    rem    = [tuple(_item(r) for r in removed)] * len(chunks)
+    out    = (ex.map if ex is not None else map)(_net_reach, rem, chunks)
+    return [r for chunk in out for r in chunk]
+
+
 def total_pairwise_km(G: nx.Graph, n_orig: int, penalty: float = 3000.0) -> float:
     """Sum of all-pairs shortest path lengths; disconnected pairs penalised."""
-    if not nx.is_connected(G):
-        comp = [len(c) for c in nx.connected_components(G)]
-        unreachable = n_orig * (n_orig - 1) - sum(s * (s - 1) for s in comp)
-        ap = dict(nx.all_pairs_dijkstra_path_length(G, weight="km"))
-        reachable = sum(ap[u][v] for u in ap for v in ap[u] if u != v)
-        return reachable + unreachable * penalty
-    ap = dict(nx.all_pairs_dijkstra_path_length(G, weight="km"))
-    return sum(ap[u][v] for u in ap for v in ap[u] if u != v)
+    A, _ = graph_csr(G)
+    return pairwise_total(A, np.ones(A.shape[0], dtype=bool), n_orig, penalty)
 
 
 # ── 2. Betweenness centrality ─────────────────────────────────────────────────
@@ -189,24 +471,25 @@ def compute_betweenness(G: nx.Graph, nodes: dict) -> tuple[pd.DataFrame, pd.Data
 
 # ── 3. Node removal impact ────────────────────────────────────────────────────
 def compute_node_criticality(G: nx.Graph, nodes: dict, baseline: float,
-                              n_orig: int) -> pd.DataFrame:
+                              n_orig: int, workers=NETWORK_WORKERS) -> pd.DataFrame:
     print("Computing node removal impact...")
-    all_pairs_base = dict(nx.all_pairs_dijkstra_path_length(G, weight="km"))
+    A, order = graph_csr(G)
+    ex = candidate_pool(A, workers)
+    scores = reach_candidates(ex, (), range(len(order)))
+    if ex is not None:
+        ex.shutdown()
 
     results = []
-    for node in G.nodes():
-        G_tmp = G.copy()
-        G_tmp.remove_node(node)
-        if not nx.is_connected(G_tmp):
-            comp = [len(c) for c in nx.connected_components(G_tmp)]
-            n_comp = len(comp)
-            reachable = sum(s * (s - 1) for s in comp)
+    for (i, km, reachable, n_left), node in zip(scores, order):
+        if reachable < n_left * (n_left - 1):
+            keep = np.ones(len(order), dtype=bool)
+            keep[i] = False
+            n_comp = len(components(A, keep))
             disc_ratio = 1 - reachable / ((n_orig - 1) * (n_orig - 2))
             eff_increase = disc_ratio * 10000
             delta_pct = None
         else:
-            ap = dict(nx.all_pairs_dijkstra_path_length(G_tmp, weight="km"))
-            new_total = sum(ap[u][v] for u in ap for v in ap[u] if u != v)
+            new_total = km
             delta = new_total - baseline
             eff_increase = delta
             delta_pct = 100 * delta / baseline
@@ -228,37 +511,136 @@ def compute_node_criticality(G: nx.Graph, nodes: dict, baseline: float,
     return df
 
 
+# ── 3b. Edge removal impact ───────────────────────────────────────────────────
+# Only bridges disconnect the graph; their Δ comes straight from the distance
+# matrix (ShortestPaths.reach_bridge). An edge longer than the shortest route
+# between its ends carries no shortest path, so its Δ is 0. Only the rest
+# need a shortest-path update.
+def edge_classes(sp: ShortestPaths, edges: list) -> tuple[set, set]:
+    """(bridges, edges on no shortest path) among the alive `edges`."""
+    H = nx.Graph([e for e in edges if np.isfinite(sp.weight(*e))])
+    bridges = {tuple(sorted(b)) for b in nx.bridges(H)}
+    idle    = {e for e in edges if tuple(sorted(e)) not in bridges
+               and not sp.on_path(*e)}
+    return bridges, idle
+
+
+def compute_edge_criticality(G: nx.Graph, nodes: dict, baseline: float,
+                             n_orig: int, workers=NETWORK_WORKERS) -> pd.DataFrame:
+    print("Computing edge removal impact...")
+    A, order = graph_csr(G)
+    idx   = {nd: i for i, nd in enumerate(order)}
+    edges = [(idx[u], idx[v]) for u, v in G.edges()]
+    sp    = ShortestPaths(A)
+    bridges, idle = edge_classes(sp, edges)
+    cands = [e for e in edges if tuple(sorted(e)) not in bridges and e not in idle]
+    n_comp0 = len(components(A, np.ones(len(order), dtype=bool)))
+
+    ex = candidate_pool(A, workers)
+    scores = {e: reach for e, *reach in reach_candidates(ex, (), cands)}
+    if ex is not None:
+        ex.shutdown()
+
+    results = []
+    for u, v in edges:
+        bridge = (min(u, v), max(u, v)) in bridges
+        if bridge:
+            km, reachable, n_left = sp.reach_bridge(u, v)
+        else:
+            km, reachable, n_left = scores.get((u, v)) or sp.reach()
+        if reachable < n_left * (n_left - 1):
+            n_comp = n_comp0 + 1
+            disc_ratio = 1 - reachable / (n_orig * (n_orig - 1))
+            eff_increase = disc_ratio * 10000
+            delta_pct = None
+        else:
+            delta = km - baseline
+            eff_increase = delta
+            delta_pct = 100 * delta / baseline
+            disc_ratio = 0
+            n_comp = 1
+
+        results.append({
+            "u": order[u], "v": order[v],
+            "u_name": nodes[order[u]][0], "v_name": nodes[order[v]][0],
+            "km": G[order[u]][order[v]].get("km", 0),
+            "bridge": bridge,
+            "shortest_path": (u, v) not in idle,
+            "connected": n_comp == 1,
+            "n_components": n_comp,
+            "disruption_ratio": disc_ratio,
+            "effective_increase": eff_increase,
+            "delta_pct": delta_pct,
+        })
+
+    df = pd.DataFrame(results).sort_values("effective_increase", ascending=False)
+    print(f"  {len(bridges)} bridges, {len(idle)} edges on no shortest path, "
+          f"{len(cands)} of {len(edges)} edges re-solved")
+    print("  Done.")
+    return df
+
+
 # ── 4. Greedy optimal blockade ────────────────────────────────────────────────
-def greedy_blockade(G: nx.Graph, nodes: dict, n_steps: int = 20) -> pd.DataFrame:
+# Lazy (CELF) selection skips most re-evaluations on large graphs, but the
+# objective is not submodular, so it can pick a different sequence.
+GREEDY_LAZY = False
+
+def greedy_blockade(G: nx.Graph, nodes: dict, n_steps: int = 20,
+                    lazy: bool = GREEDY_LAZY, workers=NETWORK_WORKERS) -> pd.DataFrame:
+    """
+    Remove, step by step, the node whose removal most increases total
+    pairwise km. With `lazy` (CELF), candidates sit in a heap keyed by
+    their last computed gain; only the top one is re-scored, and it is
+    taken once its gain is current for this step (ties go to the earlier
+    node, as in the full scan). That is exact only if gains never grow as
+    nodes are removed. Here they can: cutting one route raises the value
+    of cutting its detour, and the disconnection penalty switches on, so
+    on the 79-node graph CELF departs from the full scan at step 2.
+    The full scan scores each step's candidates on the candidate pool.
+    """
     print(f"Computing greedy optimal blockade (top {n_steps} steps)...")
-    n_orig = G.number_of_nodes()
-    baseline = total_pairwise_km(G, n_orig)
-    G_curr = G.copy()
+    A, order = graph_csr(G)
+    n_orig = len(order)
+    sp     = ShortestPaths(A)
+    baseline = sp.total(n_orig)
     seq = []
+    heap, evals, full = [], 0, 0
+    removed = []
+    ex = None if lazy else candidate_pool(A, workers)
 
     for step in range(n_steps):
         best_node = None
         best_impact = -np.inf
-
-        for n in list(G_curr.nodes()):
-            G_test = G_curr.copy()
-            G_test.remove_node(n)
-            if G_test.number_of_nodes() == 0:
-                continue
-            score = total_pairwise_km(G_test, n_orig)
-            if score - baseline > best_impact:
-                best_impact = score - baseline
-                best_node = n
+        full += int(sp.alive.sum()) if sp.alive.sum() > 1 else 0
+
+        if lazy and sp.alive.sum() > 1:
+            if step == 0:
+                heap = [(-np.inf, n, -1) for n in np.flatnonzero(sp.alive)]
+            while heap:
+                gain, n, fresh = heapq.heappop(heap)
+                if fresh == step:
+                    best_impact, best_node = -gain, n
+                    break
+                evals += 1
+                heapq.heappush(heap, (baseline - sp.total(n_orig, nodes=[n]), n, step))
+        elif sp.alive.sum() > 1:
+            for n, *reach in reach_candidates(ex, removed, np.flatnonzero(sp.alive)):
+                evals += 1
+                score = penalised(*reach, n_orig)
+                if score - baseline > best_impact:
+                    best_impact = score - baseline
+                    best_node = n
 
         if best_node is None:
             break
 
-        G_curr.remove_node(best_node)
-        new_score = total_pairwise_km(G_curr, n_orig)
-        nd = nodes.get(best_node, ("?", 0, 0))
+        sp.remove(nodes=[best_node])
+        removed.append(best_node)
+        new_score = sp.total(n_orig)
+        nd = nodes.get(order[best_node], ("?", 0, 0))
         seq.append({
             "step": step + 1,
-            "node": best_node,
+            "node": order[best_node],
             "name": nd[0],
             "lat": nd[1], "lon": nd[2],
             "step_impact_pct": 100 * best_impact / baseline,
@@ -267,16 +649,80 @@ def greedy_blockade(G: nx.Graph, nodes: dict, n_steps: int = 20) -> pd.DataFrame
         print(f"  Step {step+1:2d}: {nd[0]:<22}  cumulative +{100*(new_score-baseline)/baseline:.1f}%")
         baseline = new_score
 
+    if ex is not None:
+        ex.shutdown()
+    if lazy:
+        print(f"  Lazy greedy: {evals} of {full} candidate evaluations "
+              f"({full - evals} skipped)")
+    return pd.DataFrame(seq)
+
+
+def greedy_edge_blockade(G: nx.Graph, nodes: dict, n_steps: int = 20,
+                         workers=NETWORK_WORKERS) -> pd.DataFrame:
+    """
+    Remove, step by step, the road segment whose removal most increases
+    total pairwise km. Each step re-classifies the remaining edges
+    (edge_classes): bridges are scored from the distance matrix, edges on
+    no shortest path score the current total, and only the rest go to the
+    candidate pool.
+    """
+    print(f"Computing greedy edge blockade (top {n_steps} steps)...")
+    A, order = graph_csr(G)
+    idx    = {nd: i for i, nd in enumerate(order)}
+    n_orig = len(order)
+    sp     = ShortestPaths(A)
+    start  = baseline = sp.total(n_orig)
+    edges  = [(idx[u], idx[v]) for u, v in G.edges()]
+    seq, removed = [], []
+    ex = candidate_pool(A, workers)
+
+    for step in range(n_steps):
+        alive = [e for e in edges if np.isfinite(sp.weight(*e))]
+        if not alive:
+            break
+        bridges, idle = edge_classes(sp, alive)
+        bridge_of = lambda e: tuple(sorted(e)) in bridges
+        cands  = [e for e in alive if not bridge_of(e) and e not in idle]
+        scores = {e: reach for e, *reach in reach_candidates(ex, removed, cands)}
+        current = sp.reach()
+
+        best_edge = None
+        best_impact = -np.inf
+        for e in alive:
+            reach = sp.reach_bridge(*e) if bridge_of(e) else scores.get(e, current)
+            score = penalised(*reach, n_orig)
+            if score - baseline > best_impact:
+                best_impact = score - baseline
+                best_edge = e
+
+        sp.remove(edges=[best_edge])
+        removed.append(best_edge)
+        new_score = sp.total(n_orig)
+        u, v = order[best_edge[0]], order[best_edge[1]]
+        seq.append({
+            "step": step + 1,
+            "u": u, "v": v,
+            "u_name": nodes[u][0], "v_name": nodes[v][0],
+            "km": G[u][v].get("km", 0),
+            "bridge": bridge_of(best_edge),
+            "step_impact_pct": 100 * best_impact / baseline,
+            "cumulative_pct":  100 * (new_score - start) / start,
+        })
+        print(f"  Step {step+1:2d}: {nodes[u][0] + '–' + nodes[v][0]:<36}  "
+              f"cumulative +{100*(new_score-start)/start:.1f}%")
+        baseline = new_score
+
+    if ex is not None:
+        ex.shutdown()
     return pd.DataFrame(seq)
 
 
 # ── 5. Match blockades to network, compare ────────────────────────────────────
 def compare_actual_vs_optimal(G: nx.Graph, nodes: dict,
                                bc_df: pd.DataFrame) -> pd.DataFrame:
-    df = pd.read_excel(DATA_F, sheet_name="Combined Incidents")
-    blockades = df[
-        df["Subtype"].str.contains("Blockade|Bloqueo", case=False, na=False)
-    ].dropna(subset=["Latitude", "Longitude"]).copy()
+    df = pd.read_parquet(DATA_F, columns=["SubtypeNorm", "Latitude", "Longitude"])
+    blockades = df[df["SubtypeNorm"] == BLOCKADE] \
+        .dropna(subset=["Latitude", "Longitude"]).copy()
 
     node_ids   = list(nodes.keys())
     node_coords = np.array([[nodes[n][1], nodes[n][2]] for n in node_ids])
@@ -308,6 +754,14 @@ def compare_actual_vs_optimal(G: nx.Graph, nodes: dict,
 
 # ── Main ──────────────────────────────────────────────────────────────────────
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--steps", type=int, default=20,
+                        help="greedy blockade steps (default 20)")
+    parser.add_argument("--lazy", action="store_true",
+                        help="lazy-greedy (CELF) blockade; fewer evaluations, "
+                             "may differ from the full scan")
+    args = parser.parse_args()
+
     G, nodes = build_graph()
     n_orig   = G.number_of_nodes()
     baseline = total_pairwise_km(G, n_orig)
@@ -315,13 +769,18 @@ def main():
 
     bc_df, ebc_df    = compute_betweenness(G, nodes)
     nc_df            = compute_node_criticality(G, nodes, baseline, n_orig)
-    greedy_df        = greedy_blockade(G, nodes, n_steps=20)
+    greedy_df        = greedy_blockade(G, nodes, n_steps=args.steps,
+                                       lazy=GREEDY_LAZY or args.lazy)
+    ec_df            = compute_edge_criticality(G, nodes, baseline, n_orig)
+    greedy_edge_df   = greedy_edge_blockade(G, nodes, n_steps=args.steps)
     merged_df        = compare_actual_vs_optimal(G, nodes, bc_df)
 
     bc_df.to_csv(    OUT_DIR / "betweenness.csv",        index=False)
     ebc_df.to_csv(   OUT_DIR / "edge_betweenness.csv",   index=False)
     nc_df.to_csv(    OUT_DIR / "node_criticality.csv",   index=False)
     greedy_df.to_csv(OUT_DIR / "greedy_blockade.csv",    index=False)
+    ec_df.to_csv(    OUT_DIR / "edge_criticality.csv",   index=False)
+    greedy_edge_df.to_csv(OUT_DIR / "greedy_edge_blockade.csv", index=False)
     merged_df.to_csv(OUT_DIR / "network_vs_blockades.csv", index=False)
 
     with open(OUT_DIR / "mexico_road_graph.pkl", "wb") as f:
@@ -6,6 +6,7 @@ Generates all figures for the report:
     figures/fig_cluster_map_v2.png          Regional incident cluster map
     figures/fig_network1_chokepoints.png    Optimal chokepoints vs actual blockades
     figures/fig_network2_comparison.png     4-panel statistical comparison
+    figures/fig_kde_hotspots.png            KDE hotspot surfaces (from 02)
 
 Requires outputs from 02_spatial_statistics.py and 03_network_analysis.py.
 
@@ -13,7 +14,7 @@ Usage:
     python code/04_visualisation.py
 
 Requirements:
-    pandas, numpy, scipy, networkx, matplotlib, shapely
+    pandas, pyarrow, numpy, scipy, networkx, matplotlib, shapely
 """
 
 import pickle
@@ -36,13 +37,18 @@ from pathlib import Path
 
 # ── Paths ─────────────────────────────────────────────────────────────────────
 ROOT    = Path(__file__).resolve().parent.parent
-DATA_F  = ROOT / "data" / "mexico_incidents_COMBINED_feb22-23_2026.xlsx"
+DATA_F  = ROOT / "data" / "mexico_incidents_INCIDENTS_feb22-23_2026.parquet"
+# raw records instead of canonical incidents:
+#   ROOT / "data" / "mexico_incidents_COMBINED_feb22-23_2026.parquet"
+COLUMNS = ["State", "SubtypeNorm", "Severity", "Latitude", "Longitude"]
+BLOCKADE= "Narco Blockade"   # SubtypeNorm label, see alert_lexicon.json
 GRAPH_F = ROOT / "data" / "mexico_road_graph.pkl"
 BC_F    = ROOT / "data" / "betweenness.csv"
 EBC_F   = ROOT / "data" / "edge_betweenness.csv"
 GREEDY_F= ROOT / "data" / "greedy_blockade.csv"
 NV_F    = ROOT / "data" / "network_vs_blockades.csv"
 NF_F    = ROOT / "data" / "node_criticality.csv"
+KDE_F   = ROOT / "data" / "kde_surfaces.npz"
 FIG_DIR = ROOT / "figures"
 FIG_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -422,14 +428,36 @@ def fig_comparison(G, nodes, bc_df, ebc_df, greedy_df, nv_df, blockades_df):
     print(f"  → {out}")
 
 
+# ── Figure 4: KDE hotspot surfaces ───────────────────────────────────────────
+def fig_kde_hotspots(df: pd.DataFrame, names=("severity", "severity_decay")):
+    kde = np.load(KDE_F)
+    fig, axes = plt.subplots(1, len(names), figsize=(11 * len(names), 8), facecolor="white")
+    for ax, name in zip(np.atleast_1d(axes), names):
+        z = np.ma.masked_less(kde[name], kde[name].max() * 0.01)
+        draw_mexico(ax)
+        mesh = ax.pcolormesh(kde["lon_edges"], kde["lat_edges"], z, cmap="YlOrRd",
+                             alpha=0.8, zorder=3, shading="flat")
+        ax.scatter(df["Longitude"], df["Latitude"], s=4, c="#1A1A2E",
+                   alpha=0.5, edgecolors="none", zorder=5)
+        ax.set_xlim(-120, -86); ax.set_ylim(13.5, 34)
+        ax.set_title(f"KDE — {name.replace('_', ' ')} "
+                     f"(bandwidth {float(kde['bandwidth_km']):g} km)",
+                     fontsize=11, fontweight="bold")
+        fig.colorbar(mesh, ax=ax, shrink=0.7, label="weighted events / km²")
+
+    plt.tight_layout()
+    out = FIG_DIR / "fig_kde_hotspots.png"
+    plt.savefig(out, dpi=180, bbox_inches="tight", facecolor="white")
+    plt.close()
+    print(f"  → {out}")
+
+
 # ── Main ──────────────────────────────────────────────────────────────────────
 def main():
     print("Loading data...")
-    df = pd.read_excel(DATA_F, sheet_name="Combined Incidents")
+    df = pd.read_parquet(DATA_F, columns=COLUMNS)
     df_geo = df.dropna(subset=["Latitude", "Longitude"])
-    blockades_df = df_geo[
-        df_geo["Subtype"].str.contains("Blockade|Bloqueo", case=False, na=False)
-    ].copy()
+    blockades_df = df_geo[df_geo["SubtypeNorm"] == BLOCKADE].copy()
 
     with open(GRAPH_F, "rb") as f:
         G, nodes = pickle.load(f)
@@ -442,6 +470,8 @@ def main():
     fig_cluster_map(df_geo)
     fig_network_chokepoints(G, nodes, bc_df, ebc_df, blockades_df)
     fig_comparison(G, nodes, bc_df, ebc_df, greedy_df, None, blockades_df)
+    if KDE_F.exists():
+        fig_kde_hotspots(df_geo)
     print("Done.")
 
 